@@ -0,0 +1,44 @@
+"""
+Compare the Pillow (PNG) and SVG share-card render paths.
+
+Usage:
+    python -m benchmarks.bench_card_render [iterations]
+"""
+
+import sys
+import time
+
+from services.card_generator import render_share_card
+
+
+CARD_ARGS = dict(
+    download_mbps=245.3,
+    upload_mbps=38.7,
+    ping=14.0,
+    jitter=2.3,
+    quality_score=87,
+    grade="A",
+    isp="Example Broadband",
+    location="Karachi, Pakistan",
+    server_region="Singapore",
+    timestamp="2026-01-01 12:00:00",
+    theme="dark",
+)
+
+
+def bench(format: str, iterations: int) -> None:
+    render_share_card(**CARD_ARGS, format=format)  # warm-up (fonts, imports)
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        size = len(render_share_card(**CARD_ARGS, format=format))
+    elapsed = time.perf_counter() - start
+
+    per_call_ms = elapsed / iterations * 1000
+    print(f"{format:>4}: {per_call_ms:8.3f} ms/card  {iterations / elapsed:10.1f} cards/s  {size:7d} bytes")
+
+
+if __name__ == "__main__":
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    for fmt in ("png", "svg"):
+        bench(fmt, iterations)
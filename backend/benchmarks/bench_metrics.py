@@ -0,0 +1,67 @@
+"""
+Per-request cost of the metrics middleware: a minimal ASGI app called
+directly versus the same app wrapped in MetricsMiddleware, plus the raw
+cost of one histogram observation.
+
+Usage:
+    python -m benchmarks.bench_metrics [requests]
+"""
+
+import asyncio
+import sys
+import time
+
+from services.metrics import Histogram, MetricsMiddleware
+
+
+class _Route:
+    path = "/ping"
+
+    @staticmethod
+    async def endpoint():
+        pass
+
+
+class _App:
+    routes = [_Route()]
+
+    async def __call__(self, scope, receive, send):
+        scope["endpoint"] = _Route.endpoint
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"{}"})
+
+
+inner = _App()
+
+
+async def _drive(app, requests: int) -> float:
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        pass
+
+    start = time.perf_counter()
+    for _ in range(requests):
+        scope = {"type": "http", "method": "GET", "path": "/ping", "app": inner}
+        await app(scope, receive, send)
+    return (time.perf_counter() - start) / requests
+
+
+def main(requests: int):
+    bare = asyncio.run(_drive(inner, requests))
+    wrapped = asyncio.run(_drive(MetricsMiddleware(inner), requests))
+    print(f"{'bare app':>22}: {bare * 1e6:8.2f} us/request")
+    print(f"{'with metrics':>22}: {wrapped * 1e6:8.2f} us/request")
+    print(f"{'middleware overhead':>22}: {(wrapped - bare) * 1e6:8.2f} us/request")
+
+    histogram = Histogram("bench_seconds", "bench", ("route",))
+    start = time.perf_counter()
+    for i in range(requests):
+        histogram.observe(0.0012, "/ping")
+    observe = (time.perf_counter() - start) / requests
+    print(f"{'histogram observe':>22}: {observe * 1e6:8.2f} us")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
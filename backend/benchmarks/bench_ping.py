@@ -0,0 +1,85 @@
+"""
+Ping requests/sec for one worker: the original handler (PingResponse model,
+response_model revalidation, stdlib JSON) versus the pre-encoded ping
+response. Requests are driven straight through the ASGI interface, so the
+numbers are the framework + handler cost without any network I/O.
+
+Usage:
+    python -m benchmarks.bench_ping [requests]
+"""
+
+import asyncio
+import json
+import sys
+import time
+
+from fastapi import APIRouter, FastAPI
+
+from models import PingRequest, PingResponse
+from routers import speedtest
+
+
+legacy_router = APIRouter(prefix="/speedtest")
+
+
+@legacy_router.post("/ping", response_model=PingResponse)
+async def legacy_ping(request: PingRequest):
+    start_time = int(time.time() * 1000)
+    server_time = int(time.time() * 1000)
+    return PingResponse(
+        seq=request.seq,
+        client_time=request.client_time,
+        server_time=server_time,
+        server_process_time=server_time - start_time
+    )
+
+
+def _app(router: APIRouter) -> FastAPI:
+    app = FastAPI()
+    app.include_router(router, prefix="/api/v1")
+    return app
+
+
+async def _drive(app: FastAPI, requests: int) -> float:
+    body = json.dumps({"client_time": 1700000000000, "seq": 7}).encode()
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": "/api/v1/speedtest/ping",
+        "raw_path": b"/api/v1/speedtest/ping",
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        "client": ("127.0.0.1", 50000),
+        "server": ("127.0.0.1", 8000),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    responses = []
+
+    async def send(message):
+        if message["type"] == "http.response.body":
+            responses.append(message["body"])
+
+    await app(dict(scope), receive, send)
+    assert json.loads(responses[-1])["seq"] == 7, responses[-1]
+
+    start = time.perf_counter()
+    for _ in range(requests):
+        await app(dict(scope), receive, send)
+    return requests / (time.perf_counter() - start)
+
+
+def main(requests: int):
+    for label, router in (("model + response_model", legacy_router), ("pre-encoded", speedtest.router)):
+        rate = asyncio.run(_drive(_app(router), requests))
+        print(f"{label:>24}: {rate:10.0f} requests/s  ({1e6 / rate:6.1f} us/request)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
@@ -0,0 +1,95 @@
+"""
+Reads/sec and writes/sec for the share store: the old connection-per-call
+rollback-journal access pattern versus persistent WAL connections driven
+through the ShareDB thread pool.
+
+Usage:
+    python -m benchmarks.bench_share_db [operations]
+"""
+
+import asyncio
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from services.share_db import ShareDB
+from services.share_store import SQLiteShareStore, SQL_INSERT
+
+
+LEGACY_SELECT = "SELECT share_id, report_data, created_at, expires_at FROM shared_reports WHERE share_id = ?"
+REPORT = json.dumps({"speedResult": {"download": {"speedMbps": 120.5}}, "samples": list(range(200))})
+
+
+class ConnectionPerCallStore(SQLiteShareStore):
+    """The pre-WAL access pattern: open, execute, commit, close on every call."""
+
+    def _open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def insert_many(self, rows):
+        conn = self._open()
+        try:
+            for row in rows:
+                conn.execute(SQL_INSERT, row)
+                conn.commit()
+            return [None] * len(rows)
+        finally:
+            conn.close()
+
+    def get_report(self, share_id):
+        conn = self._open()
+        try:
+            row = conn.execute(LEGACY_SELECT, (share_id,)).fetchone()
+            return dict(row) if row else None
+        finally:
+            conn.close()
+
+
+def _rows(n):
+    now = datetime.utcnow()
+    expires = (now + timedelta(days=7)).isoformat()
+    return [(uuid.uuid4().hex[:12], REPORT, now.isoformat(), expires) for _ in range(n)]
+
+
+async def _measure(db: ShareDB, operations: int, concurrency: int = 16):
+    rows = _rows(operations)
+    sem = asyncio.Semaphore(concurrency)
+
+    async def call(func, *args):
+        async with sem:
+            await db.run(func, *args)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(call(db.insert_report, *row) for row in rows))
+    writes = operations / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(call(db.get_report, row[0]) for row in rows))
+    reads = operations / (time.perf_counter() - start)
+    return writes, reads
+
+
+def main(operations: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, cls in (("connection-per-call", ConnectionPerCallStore), ("persistent WAL", SQLiteShareStore)):
+            store = cls(os.path.join(tmp, f"{cls.__name__}.db"))
+            if cls is ConnectionPerCallStore:
+                # Undo the WAL switch done when the schema was created to get the old journal mode
+                store.db.conn().execute("PRAGMA journal_mode=DELETE")
+                store.close()
+            db = ShareDB(store)
+
+            writes, reads = asyncio.run(_measure(db, operations))
+            db.close()
+            print(f"{label:>20}: {writes:10.0f} writes/s  {reads:10.0f} reads/s")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
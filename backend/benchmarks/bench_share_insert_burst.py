@@ -0,0 +1,64 @@
+"""
+Burst insert throughput: one transaction per /share/create versus the
+ShareDB group-commit queue, on one SQLite file and on sharded files.
+
+Usage:
+    python -m benchmarks.bench_share_insert_burst [concurrent_inserts]
+"""
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from services.share_db import ShareDB
+from services.share_store import SQLiteShareStore, ShardedSQLiteShareStore
+
+
+REPORT = json.dumps({"speedResult": {"download": {"speedMbps": 120.5}}, "samples": list(range(200))})
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def _burst(db: ShareDB, inserts: int, grouped: bool):
+    now = datetime.utcnow()
+    created, expires = now.isoformat(), (now + timedelta(days=7)).isoformat()
+    latencies = []
+
+    async def one():
+        args = (db.new_share_id(), REPORT, created, expires)
+        start = time.perf_counter()
+        if grouped:
+            await db.queue_insert(*args)
+        else:
+            await db.run(db.insert_report, *args)
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(inserts)))
+    elapsed = time.perf_counter() - start
+    return inserts / elapsed, _percentile(latencies, 50) * 1000, _percentile(latencies, 99) * 1000
+
+
+def main(inserts: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        variants = (
+            ("per-request txn", False, lambda path: SQLiteShareStore(path)),
+            ("group commit", True, lambda path: SQLiteShareStore(path)),
+            ("group, 4 shards", True, lambda path: ShardedSQLiteShareStore(path, 4)),
+        )
+        for i, (label, grouped, make_store) in enumerate(variants):
+            db = ShareDB(make_store(os.path.join(tmp, f"burst{i}.db")))
+            rate, p50, p99 = asyncio.run(_burst(db, inserts, grouped))
+            db.close()
+            print(f"{label:>16}: {rate:9.0f} inserts/s  p50 {p50:7.1f} ms  p99 {p99:7.1f} ms")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
@@ -0,0 +1,82 @@
+"""
+Size reduction and read latency of compressed shared-report payloads
+versus the legacy JSON TEXT storage.
+
+Usage:
+    python -m benchmarks.bench_share_payload [reports]
+"""
+
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from services import share_store
+from services.share_store import SQLiteShareStore, PAYLOAD_RAW, PAYLOAD_ZLIB, PAYLOAD_ZSTD
+
+
+def history_report() -> str:
+    """A history-heavy report: per-sample throughput graphs and ping series."""
+    rng = random.Random(42)
+    return json.dumps({
+        "timestamp": datetime.utcnow().isoformat(),
+        "speedResult": {
+            "download": {"speedMbps": 231.4, "bytesTransferred": 104857600, "durationMs": 3620},
+            "upload": {"speedMbps": 41.2, "bytesTransferred": 26214400, "durationMs": 5090},
+            "ping": {"latencyMs": 13.2, "jitterMs": 1.9, "samples": 20},
+        },
+        "history": [
+            {
+                "timestamp": f"2026-01-{day:02d}T12:00:00Z",
+                "downloadGraph": [round(rng.uniform(180, 260), 2) for _ in range(400)],
+                "uploadGraph": [round(rng.uniform(30, 45), 2) for _ in range(400)],
+                "pingSamples": [round(rng.uniform(10, 18), 2) for _ in range(50)],
+            }
+            for day in range(1, 15)
+        ],
+    })
+
+
+def bench(label: str, payload_format, report: str, reports: int, tmp: str):
+    path = os.path.join(tmp, f"{label}.db")
+    db = SQLiteShareStore(path)
+    now = datetime.utcnow().isoformat()
+    expires = (datetime.utcnow() + timedelta(days=7)).isoformat()
+
+    conn = db.db.conn()
+    with conn:
+        for i in range(reports):
+            value = report if payload_format is None else share_store.encode_payload(report, payload_format)
+            conn.execute(share_store.SQL_INSERT, (f"r{i}", value, now, expires))
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    stored = len(report) if payload_format is None else len(share_store.encode_payload(report, payload_format))
+
+    for i in range(reports):  # warm the page cache
+        db.get_report(f"r{i}")
+
+    start = time.perf_counter()
+    for i in range(reports):
+        db.get_report(f"r{i}")
+    read_us = (time.perf_counter() - start) / reports * 1e6
+
+    db.close()
+    print(f"{label:>6}: {stored:9d} bytes/report  {os.path.getsize(path) / 1024:9.0f} KiB file  {read_us:8.1f} us/read")
+
+
+def main(reports: int):
+    report = history_report()
+    variants = [("text", None), ("raw", PAYLOAD_RAW), ("zlib", PAYLOAD_ZLIB)]
+    if share_store.zstandard is not None:
+        variants.append(("zstd", PAYLOAD_ZSTD))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, payload_format in variants:
+            bench(label, payload_format, report, reports, tmp)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
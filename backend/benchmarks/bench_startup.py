@@ -0,0 +1,136 @@
+"""
+Cold-start profile: import time per module for `main`, and wall time from
+launching uvicorn to the first successful /health response.
+
+Exits non-zero when the median cold start exceeds the budget or when a
+dependency that should be lazy (Pillow, numpy, httpx) is loaded at import
+time, so it can gate CI.
+
+Usage:
+    python -m benchmarks.bench_startup [--budget SECONDS] [--runs N] [--top N]
+"""
+
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from typing import Dict, List, Tuple
+
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LAZY_MODULES = ("PIL", "numpy", "httpx")
+DEFAULT_BUDGET_SECONDS = 2.0
+
+
+def _env(tmp: str) -> Dict[str, str]:
+    env = dict(os.environ)
+    env.update({
+        "SHARE_DB_PATH": os.path.join(tmp, "shared_reports.db"),
+        "RESULTS_DB_PATH": os.path.join(tmp, "test_results.db"),
+        "TRANSFER_SESSION_DB_PATH": os.path.join(tmp, "transfer_sessions.db"),
+        "WORKER_LOCK_PATH": os.path.join(tmp, "workers.lock"),
+    })
+    return env
+
+
+def import_profile(env: Dict[str, str]) -> List[Tuple[str, int, int]]:
+    """(module, self µs, cumulative µs) for every module imported by `import main`."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def eager_heavy_modules(env: Dict[str, str]) -> List[str]:
+    """Lazy dependencies that `import main` loaded anyway."""
+    code = f"import sys, main; print(' '.join(m for m in {LAZY_MODULES!r} if m in sys.modules))"
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True
+    )
+    return result.stdout.split()
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def cold_start(env: Dict[str, str], timeout: float = 30.0) -> float:
+    """Seconds from spawning uvicorn to the first 200 from /health."""
+    port = _free_port()
+    url = f"http://127.0.0.1:{port}/health"
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                with urllib.request.urlopen(url, timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - start
+            except OSError:
+                time.sleep(0.01)
+        raise TimeoutError(f"/health did not respond within {timeout}s")
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET_SECONDS,
+                        help="max median seconds to first /health")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=15, help="slowest modules to list")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = _env(tmp)
+
+        rows = import_profile(env)
+        total_us = next(cumulative for name, _, cumulative in rows if name == "main")
+        print(f"import main: {total_us / 1000:.1f} ms across {len(rows)} modules\n")
+        print(f"{'self ms':>9} {'cumul ms':>9}  module")
+        for name, self_us, cumulative_us in sorted(rows, key=lambda row: row[1], reverse=True)[:args.top]:
+            print(f"{self_us / 1000:9.1f} {cumulative_us / 1000:9.1f}  {name}")
+
+        print("\nproject modules (cumulative):")
+        for name, _, cumulative_us in rows:
+            if name in ("main", "config", "models") or name.startswith(("routers.", "services.")):
+                print(f"{cumulative_us / 1000:9.1f}  {name}")
+
+        eager = eager_heavy_modules(env)
+        timings = [cold_start(env) for _ in range(args.runs)]
+
+    median = statistics.median(timings)
+    print(f"\ncold start to first /health: median {median:.2f}s "
+          f"(min {min(timings):.2f}s, {args.runs} runs, budget {args.budget:.2f}s)")
+
+    failed = False
+    if eager:
+        print(f"FAIL: loaded at startup but should be lazy: {', '.join(eager)}")
+        failed = True
+    if median > args.budget:
+        print(f"FAIL: cold start over budget by {median - args.budget:.2f}s")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
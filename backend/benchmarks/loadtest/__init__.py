@@ -0,0 +1,11 @@
+"""
+Mixed-workload load tests for every API endpoint.
+
+Drives the app in-process through httpx's ASGI transport, or a locally
+launched uvicorn, and reports throughput and p50/p95/p99 latency per
+endpoint as JSON so runs can be compared between commits.
+
+Usage:
+    python -m benchmarks.loadtest [--target asgi|uvicorn] [--workload mixed]
+        [--duration 10] [--concurrency 16] [--output run.json] [--baseline old.json]
+"""
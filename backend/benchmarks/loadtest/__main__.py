@@ -0,0 +1,186 @@
+"""
+Run a load test and print its JSON report. See benchmarks/loadtest/__init__.py.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional
+
+import httpx
+
+from benchmarks.loadtest.geo_stub import GeoStub
+from benchmarks.loadtest.scenarios import WORKLOADS, Context
+from benchmarks.loadtest.stats import Recorder, format_table
+
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Client address seen by the app in ASGI mode (TEST-NET-3, never a real user)
+ASGI_CLIENT = ("203.0.113.10", 50000)
+
+
+def _app_env(tmp: str, geo_url: str) -> Dict[str, str]:
+    """Isolated databases and the geolocation stub for the app under test."""
+    return {
+        "SHARE_DB_PATH": os.path.join(tmp, "shared_reports.db"),
+        "RESULTS_DB_PATH": os.path.join(tmp, "test_results.db"),
+        "TRANSFER_SESSION_DB_PATH": os.path.join(tmp, "transfer_sessions.db"),
+        "WORKER_LOCK_PATH": os.path.join(tmp, "workers.lock"),
+        "IP_API_URL": geo_url,
+    }
+
+
+@asynccontextmanager
+async def asgi_client(env: Dict[str, str], concurrency: int) -> AsyncIterator[httpx.AsyncClient]:
+    """Client wired straight into the app in this process, lifespan included."""
+    os.environ.update(env)
+    sys.path.insert(0, BACKEND_DIR)
+    import main
+
+    transport = httpx.ASGITransport(app=main.app, client=ASGI_CLIENT)
+    async with main.app.router.lifespan_context(main.app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest") as client:
+            yield client
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@asynccontextmanager
+async def uvicorn_client(
+    env: Dict[str, str], concurrency: int, workers: int
+) -> AsyncIterator[httpx.AsyncClient]:
+    """Client for a uvicorn server launched on a free local port."""
+    port = _free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning", "--no-access-log"],
+        cwd=BACKEND_DIR, env={**os.environ, **env}
+    )
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    try:
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30.0) as client:
+            deadline = time.monotonic() + 30
+            while True:
+                try:
+                    if (await client.get("/health")).status_code == 200:
+                        break
+                except httpx.HTTPError:
+                    pass
+                if time.monotonic() > deadline or proc.poll() is not None:
+                    raise RuntimeError("uvicorn did not become healthy")
+                await asyncio.sleep(0.05)
+            yield client
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+async def run_workload(
+    client: httpx.AsyncClient,
+    workload: str,
+    duration: float,
+    concurrency: int,
+    seed: int
+) -> Dict[str, Any]:
+    """`concurrency` virtual users pick weighted scenarios until `duration` elapses."""
+    ctx = Context(seed)
+    recorder = Recorder()
+    scenarios, weights = zip(*WORKLOADS[workload].items())
+    deadline = time.perf_counter() + duration
+
+    async def user():
+        while time.perf_counter() < deadline:
+            scenario = ctx.rng.choices(scenarios, weights)[0]
+            await scenario(client, recorder, ctx)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(user() for _ in range(concurrency)))
+    return recorder.summary(time.perf_counter() - start)
+
+
+def _commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    stub = GeoStub(latency_ms=args.geo_latency_ms)
+    await stub.start()
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            env = _app_env(tmp, stub.url)
+            if args.target == "asgi":
+                client_cm = asgi_client(env, args.concurrency)
+            else:
+                client_cm = uvicorn_client(env, args.concurrency, args.workers)
+            async with client_cm as client:
+                if args.warmup:
+                    await run_workload(client, args.workload, args.warmup, args.concurrency, args.seed + 1)
+                results = await run_workload(client, args.workload, args.duration, args.concurrency, args.seed)
+    finally:
+        await stub.stop()
+
+    return {
+        "target": args.target,
+        "workload": args.workload,
+        "duration_s": args.duration,
+        "concurrency": args.concurrency,
+        "workers": args.workers if args.target == "uvicorn" else 1,
+        "seed": args.seed,
+        "commit": _commit(),
+        "python": platform.python_version(),
+        "timestamp": int(time.time()),
+        **results,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.loadtest", description="Mixed-workload load test")
+    parser.add_argument("--target", choices=("asgi", "uvicorn"), default="asgi")
+    parser.add_argument("--workload", choices=sorted(WORKLOADS), default="mixed")
+    parser.add_argument("--duration", type=float, default=10.0, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=1.0, help="unmeasured seconds before the run")
+    parser.add_argument("--concurrency", type=int, default=16, help="virtual users")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers (uvicorn target)")
+    parser.add_argument("--geo-latency-ms", type=float, default=20.0, help="simulated geolocation provider latency")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--baseline", help="JSON report of an earlier run to compare against")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    print(format_table(report, baseline), file=sys.stderr)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return 1 if report["total"]["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
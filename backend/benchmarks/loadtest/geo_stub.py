@@ -0,0 +1,71 @@
+"""
+Minimal HTTP/1.1 stand-in for the ip-api.com JSON API, so geolocation
+lookups can be load tested without leaving the machine. Point the app at it
+with IP_API_URL.
+"""
+
+import asyncio
+import json
+from typing import Optional
+
+
+RESPONSE_BODY = json.dumps({
+    "status": "success",
+    "country": "Benchland",
+    "countryCode": "BL",
+    "region": "BL-1",
+    "regionName": "Bench Region",
+    "city": "Bench City",
+    "zip": "00000",
+    "lat": 51.5074,
+    "lon": -0.1278,
+    "timezone": "UTC",
+    "isp": "Bench ISP",
+    "org": "Bench Org",
+    "as": "AS64500 Bench Networks",
+    "proxy": False,
+    "hosting": False,
+    "query": "203.0.113.10",
+}).encode()
+
+RESPONSE = (
+    b"HTTP/1.1 200 OK\r\n"
+    b"Content-Type: application/json\r\n"
+    b"Content-Length: " + str(len(RESPONSE_BODY)).encode() + b"\r\n"
+    b"\r\n" + RESPONSE_BODY
+)
+
+
+class GeoStub:
+    def __init__(self, latency_ms: float = 0.0):
+        self.latency = latency_ms / 1000
+        self.requests = 0
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}/json"
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                # Requests are bodiless GETs, so the header block is the whole request
+                await reader.readuntil(b"\r\n\r\n")
+                self.requests += 1
+                if self.latency:
+                    await asyncio.sleep(self.latency)
+                writer.write(RESPONSE)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
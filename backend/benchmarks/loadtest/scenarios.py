@@ -0,0 +1,193 @@
+"""
+User actions the load test mixes together. Each scenario performs one
+action (possibly several requests, e.g. a ping burst) and records every
+request under its route label.
+"""
+
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import httpx
+
+from benchmarks.loadtest.stats import Recorder
+
+
+API = "/api/v1"
+PING_BURST = 10
+DOWNLOAD_SIZE = 1024 * 1024
+UPLOAD_BODY = b"\x00" * (1024 * 1024)
+
+REPORT = {
+    "speedResult": {
+        "download": {"speedMbps": 212.4},
+        "upload": {"speedMbps": 48.9},
+        "ping": {"latencyMs": 14.0, "jitterMs": 1.8},
+    },
+    "connection": {"isp": "Bench ISP", "location": "Bench City, Benchland"},
+    "serverRegion": "Europe",
+    "timestamp": "2024-01-01T12:00:00Z",
+    "samples": list(range(200)),
+}
+CARD_REQUEST = {
+    "download_mbps": 212.4,
+    "upload_mbps": 48.9,
+    "ping": 14.0,
+    "jitter": 1.8,
+    "quality_score": 92,
+    "grade": "A",
+    "isp": "Bench ISP",
+    "location": "Bench City, Benchland",
+    "server_region": "Europe",
+    "timestamp": "2024-01-01T12:00:00Z",
+}
+
+
+class Context:
+    """State shared by all virtual users of one run."""
+
+    def __init__(self, seed: int):
+        self.rng = random.Random(seed)
+        self.share_ids: List[str] = []
+
+
+async def request(
+    client: httpx.AsyncClient,
+    recorder: Recorder,
+    label: str,
+    method: str,
+    url: str,
+    **kwargs: Any
+) -> Optional[httpx.Response]:
+    """Send one request and record its latency, status and body size under `label`."""
+    start = time.perf_counter()
+    try:
+        response = await client.request(method, url, **kwargs)
+    except httpx.HTTPError:
+        recorder.record(label, time.perf_counter() - start, ok=False)
+        return None
+    recorder.record(
+        label, time.perf_counter() - start,
+        ok=response.status_code < 400, nbytes=len(response.content)
+    )
+    return response
+
+
+async def ping_burst(client, recorder, ctx):
+    for seq in range(PING_BURST):
+        await request(
+            client, recorder, "POST /speedtest/ping", "POST", f"{API}/speedtest/ping",
+            json={"client_time": int(time.time() * 1000), "seq": seq}
+        )
+
+
+async def download(client, recorder, ctx):
+    await request(
+        client, recorder, "GET /speedtest/download", "GET", f"{API}/speedtest/download",
+        params={"size": DOWNLOAD_SIZE}
+    )
+
+
+async def upload(client, recorder, ctx):
+    await request(
+        client, recorder, "POST /speedtest/upload", "POST", f"{API}/speedtest/upload",
+        content=UPLOAD_BODY, headers={"content-type": "application/octet-stream"}
+    )
+
+
+async def ip_info(client, recorder, ctx):
+    await request(client, recorder, "GET /ip-info", "GET", f"{API}/ip-info")
+
+
+async def network_quality(client, recorder, ctx):
+    await request(
+        client, recorder, "POST /network-quality", "POST", f"{API}/network-quality",
+        json={"ping": 14.0, "jitter": 1.8, "download_mbps": 212.4, "upload_mbps": 48.9}
+    )
+
+
+async def server_regions(client, recorder, ctx):
+    await request(client, recorder, "GET /server-regions", "GET", f"{API}/server-regions")
+
+
+async def nearest_servers(client, recorder, ctx):
+    await request(
+        client, recorder, "GET /server-regions/nearest", "GET", f"{API}/server-regions/nearest",
+        params={"lat": ctx.rng.uniform(-60, 70), "lon": ctx.rng.uniform(-180, 180)}
+    )
+
+
+async def card_render(client, recorder, ctx):
+    await request(
+        client, recorder, "POST /generate-share-card", "POST", f"{API}/generate-share-card",
+        json=CARD_REQUEST
+    )
+
+
+async def share_create(client, recorder, ctx):
+    response = await request(
+        client, recorder, "POST /share/create", "POST", f"{API}/share/create",
+        json={"report_data": REPORT}
+    )
+    if response is not None and response.status_code == 200:
+        ctx.share_ids.append(response.json()["share_id"])
+
+
+async def share_read(client, recorder, ctx):
+    if not ctx.share_ids:
+        await share_create(client, recorder, ctx)
+        return
+    share_id = ctx.rng.choice(ctx.share_ids)
+    await request(client, recorder, "GET /share/{id}", "GET", f"{API}/share/{share_id}")
+
+
+async def share_card(client, recorder, ctx):
+    if not ctx.share_ids:
+        await share_create(client, recorder, ctx)
+        return
+    share_id = ctx.rng.choice(ctx.share_ids)
+    fmt = ctx.rng.choice(("png", "svg"))
+    await request(
+        client, recorder, f"GET /share/{{id}}/card.{fmt}", "GET", f"{API}/share/{share_id}/card.{fmt}"
+    )
+
+
+async def submit_result(client, recorder, ctx):
+    await request(
+        client, recorder, "POST /results", "POST", f"{API}/results",
+        json={
+            "ping": ctx.rng.uniform(5, 80),
+            "jitter": ctx.rng.uniform(0.5, 10),
+            "download_mbps": ctx.rng.uniform(10, 900),
+            "upload_mbps": ctx.rng.uniform(5, 300),
+            "server_region": ctx.rng.choice(("europe", "north-america", "asia-pacific")),
+            "country_code": ctx.rng.choice(("GB", "US", "DE", "JP")),
+        }
+    )
+
+
+Scenario = Callable[[httpx.AsyncClient, Recorder, Context], Awaitable[None]]
+
+# Workload name -> {scenario: relative weight}
+WORKLOADS: Dict[str, Dict[Scenario, int]] = {
+    # Roughly what a busy deployment sees: a ping burst and transfers per
+    # test, lookups on page load, occasional shares and card renders
+    "mixed": {
+        ping_burst: 20,
+        download: 10,
+        upload: 10,
+        ip_info: 10,
+        network_quality: 8,
+        server_regions: 8,
+        nearest_servers: 5,
+        submit_result: 8,
+        share_create: 4,
+        share_read: 8,
+        share_card: 3,
+        card_render: 2,
+    },
+    "ping": {ping_burst: 1},
+    "transfer": {download: 1, upload: 1},
+    "geo": {ip_info: 3, nearest_servers: 1},
+    "share": {share_create: 2, share_read: 5, share_card: 2, card_render: 1},
+}
@@ -0,0 +1,76 @@
+"""Per-endpoint latency recording and JSON summaries."""
+
+import math
+from typing import Any, Dict, List, Optional
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list (q in 0..100)."""
+    if not sorted_values:
+        return 0.0
+    rank = math.ceil(q / 100 * len(sorted_values)) - 1
+    return sorted_values[max(0, min(rank, len(sorted_values) - 1))]
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+        self.bytes: Dict[str, int] = {}
+
+    def record(self, label: str, seconds: float, ok: bool = True, nbytes: int = 0):
+        self.latencies.setdefault(label, []).append(seconds)
+        if not ok:
+            self.errors[label] = self.errors.get(label, 0) + 1
+        self.bytes[label] = self.bytes.get(label, 0) + nbytes
+
+    def _summary(self, latencies: List[float], errors: int, nbytes: int, elapsed: float) -> Dict[str, Any]:
+        values = sorted(latencies)
+        return {
+            "requests": len(values),
+            "errors": errors,
+            "throughput_rps": round(len(values) / elapsed, 2) if elapsed else 0.0,
+            "bytes": nbytes,
+            "p50_ms": round(percentile(values, 50) * 1000, 3),
+            "p95_ms": round(percentile(values, 95) * 1000, 3),
+            "p99_ms": round(percentile(values, 99) * 1000, 3),
+            "max_ms": round(values[-1] * 1000, 3) if values else 0.0,
+        }
+
+    def summary(self, elapsed: float) -> Dict[str, Any]:
+        endpoints = {
+            label: self._summary(values, self.errors.get(label, 0), self.bytes.get(label, 0), elapsed)
+            for label, values in sorted(self.latencies.items())
+        }
+        total = self._summary(
+            [value for values in self.latencies.values() for value in values],
+            sum(self.errors.values()), sum(self.bytes.values()), elapsed
+        )
+        return {"endpoints": endpoints, "total": total}
+
+
+def format_table(report: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None) -> str:
+    """Human-readable view of a report, with p50/p99/throughput change against a baseline."""
+    lines = [
+        f"{'endpoint':<32} {'req':>7} {'err':>5} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"
+        + ("   vs baseline (p50, p99, req/s)" if baseline else "")
+    ]
+    rows = list(report["endpoints"].items()) + [("TOTAL", report["total"])]
+    for label, stats in rows:
+        line = (
+            f"{label:<32} {stats['requests']:>7} {stats['errors']:>5} {stats['throughput_rps']:>9.1f} "
+            f"{stats['p50_ms']:>9.2f} {stats['p95_ms']:>9.2f} {stats['p99_ms']:>9.2f}"
+        )
+        old = (baseline or {}).get("endpoints", {}).get(label) if label != "TOTAL" else (baseline or {}).get("total")
+        if old:
+            line += "   " + ", ".join(
+                _change(stats[key], old[key]) for key in ("p50_ms", "p99_ms", "throughput_rps")
+            )
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def _change(new: float, old: float) -> str:
+    if not old:
+        return "n/a"
+    return f"{(new - old) / old * 100:+.1f}%"
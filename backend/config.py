@@ -1,5 +1,7 @@
+from pydantic import Field
 from pydantic_settings import BaseSettings
 from functools import lru_cache
+from typing import Optional
 
 
 class Settings(BaseSettings):
@@ -8,6 +10,14 @@ class Settings(BaseSettings):
     port: int = 8000
     debug: bool = False
     
+    # Production launcher (serve.py)
+    workers: int = 0  # 0 = one per available CPU
+    backlog: int = 2048  # pending TCP connections per listening socket
+    keepalive_timeout: int = 5  # seconds an idle keep-alive connection is held
+    limit_concurrency: Optional[int] = None  # max in-flight connections per worker before 503s
+    access_log: bool = False
+    worker_lock_path: str = "speedtest-workers.lock"  # elects the worker running maintenance jobs
+    
     # CORS settings
     cors_origins: str = "*"
     
@@ -18,6 +28,41 @@ class Settings(BaseSettings):
     max_download_size: int = 50 * 1024 * 1024  # 50MB
     max_upload_size: int = 50 * 1024 * 1024  # 50MB
     
+    # Transfer admission control (host-wide limits, 0 = unlimited)
+    transfer_max_tests: int = 0  # speed tests transferring at once
+    transfer_max_bytes_per_sec: int = 0  # download + upload bytes/sec
+    transfer_queue_timeout: float = 5.0  # seconds a new test waits for a slot before 503
+    transfer_lease_seconds: float = 5.0  # idle gap after which a test's slot is freed
+    transfer_ip_rate: float = 0.0  # transfer requests/sec per client IP
+    transfer_ip_burst: int = 64  # transfer requests a client IP may start back to back
+    
+    # Multi-stream transfer sessions
+    transfer_session_sweep_interval: float = 60.0  # seconds between expired-session sweeps
+    
+    # Network impairment emulation (per-session via X-Impairment header / ?impair=)
+    impairment_enabled: bool = False
+    
+    # Server-Timing phase instrumentation
+    server_timing: bool = False  # add a Server-Timing header to every response
+    slow_request_ms: float = 0.0  # log requests slower than this (0 = off)
+    slow_request_sample_rate: float = 1.0  # fraction of slow requests logged
+    
+    # Operator endpoints (/admin/*); disabled while unset
+    admin_token: Optional[str] = None
+    profiler_max_overhead: float = Field(default=0.02, gt=0, le=1)  # max sampler CPU, as a fraction of one core
+    
+    # Shared report expiry sweeper
+    share_sweep_interval: float = 300.0  # seconds between sweeps
+    share_sweep_batch_size: int = 500  # rows deleted per transaction
+    
+    # Server health probing
+    server_probe_interval: float = 10.0  # seconds between probe rounds
+    server_probe_timeout: float = 2.0  # per-probe timeout in seconds
+    
+    # Test result ingestion
+    results_flush_interval: float = 1.0  # seconds between batched inserts
+    results_rollup_interval: float = 60.0  # seconds between rollup refreshes
+    
     class Config:
         env_file = ".env"
 
@@ -6,18 +6,52 @@ IP geolocation, shareable result cards, and multi-region server support.
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from contextlib import asynccontextmanager
+from fastapi.responses import PlainTextResponse
+from contextlib import asynccontextmanager, suppress
+import asyncio
 import uvicorn
 
 from config import get_settings
-from routers import speedtest, network, share
+from routers import speedtest, network, share, results, admin
+from services.share_db import sweep_expired
+from services.results_store import flush_results, rollup_results
+from services.transfer_sessions import sweep_expired_sessions
+from services.server_regions import registry
+from services.server_registry import probe_servers
+from services import metrics
+from services.fast_json import FastJSONResponse
+from services.worker_coordination import run_as_leader
+from services.timing import ServerTimingMiddleware
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan handler"""
     print("🚀 SpeedTest API starting up...")
+    settings = get_settings()
+    tasks = [
+        # Sweeps and rollups touch shared files, so only one worker per host runs them
+        asyncio.create_task(run_as_leader(settings.worker_lock_path, lambda: [
+            sweep_expired(share.db, settings.share_sweep_interval, settings.share_sweep_batch_size),
+            rollup_results(results.store, settings.results_rollup_interval),
+            sweep_expired_sessions(speedtest.sessions, settings.transfer_session_sweep_interval),
+        ])),
+        asyncio.create_task(flush_results(results.store, settings.results_flush_interval)),
+    ]
+    if registry.health:
+        tasks.append(asyncio.create_task(
+            probe_servers(registry, settings.server_probe_interval, settings.server_probe_timeout)
+        ))
     yield
+    for task in tasks:
+        task.cancel()
+    for task in tasks:
+        with suppress(asyncio.CancelledError):
+            await task
+    await share.db.drain()
+    share.db.close()
+    results.store.close()
+    speedtest.sessions.close()
     print("👋 SpeedTest API shutting down...")
 
 
@@ -33,8 +67,10 @@ app = FastAPI(
     - Network quality scoring
     - Server region selection
     - Shareable result card generation
+    - Historical result aggregates
     """,
     version="1.0.0",
+    default_response_class=FastJSONResponse,
     lifespan=lifespan
 )
 
@@ -48,13 +84,27 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
-    expose_headers=["Content-Length", "X-Bytes-Total", "X-Server-Time"],
+    expose_headers=["Content-Length", "X-Bytes-Total", "X-Server-Time", "X-Impairment", "Server-Timing"],
 )
 
+# Phase timings; installed only when used, so spans cost nothing otherwise
+if settings.server_timing or settings.slow_request_ms:
+    app.add_middleware(
+        ServerTimingMiddleware,
+        emit_header=settings.server_timing,
+        slow_request_ms=settings.slow_request_ms,
+        sample_rate=settings.slow_request_sample_rate,
+    )
+
+# Per-route request counts and latency histograms (outermost, so it sees everything)
+app.add_middleware(metrics.MetricsMiddleware)
+
 # Include routers
 app.include_router(speedtest.router, prefix="/api/v1")
 app.include_router(network.router, prefix="/api/v1")
 app.include_router(share.router, prefix="/api/v1")
+app.include_router(results.router, prefix="/api/v1")
+app.include_router(admin.router)
 
 
 @app.get("/")
@@ -69,10 +119,24 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    """Health check for load balancers"""
+    """
+    Health check for load balancers. With admission control enabled it also
+    reports transfer load (0..1), which the server prober picks up.
+    """
+    if speedtest.admission.enabled:
+        return {"status": "ok", "load": round(speedtest.admission.load(), 3)}
     return {"status": "ok"}
 
 
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def get_metrics():
+    """Prometheus metrics for this worker process"""
+    return PlainTextResponse(
+        metrics.registry.render(),
+        media_type="text/plain; version=0.0.4"
+    )
+
+
 if __name__ == "__main__":
     settings = get_settings()
     uvicorn.run(
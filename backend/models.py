@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import List, Optional
+from pydantic import BaseModel, Field
+from typing import Dict, List, Literal, Optional
 from datetime import datetime
 
 
@@ -24,6 +24,61 @@ class UploadResponse(BaseModel):
     server_time: int
 
 
+# Adaptive test sizing models
+class TestPlanRequest(BaseModel):
+    direction: Literal["download", "upload"] = "download"
+    rtt_ms: float = Field(gt=0, le=10000)
+    probe_bytes: int = Field(gt=0, le=50 * 1024 * 1024)  # size of the warm-up transfer (max upload size)
+    probe_seconds: float = Field(gt=0, le=60)  # client-measured time of the warm-up transfer
+
+
+class TestPlanResponse(BaseModel):
+    direction: str
+    estimated_bps: int
+    streams: int
+    duration_seconds: float  # stop starting requests once this has elapsed
+    bytes_per_stream: int  # upper bound if the test runs the full duration
+    request_size: int  # `size` for each /download request (upload body size)
+    requests_per_stream: int
+
+
+# WebSocket throughput models
+class ThroughputCommand(BaseModel):
+    type: Literal["download", "upload"]
+    duration: float = 10.0  # seconds
+    frame_size: int = 65536  # download frame size in bytes
+    interval_ms: int = 250  # sample interval
+
+
+# Multi-stream transfer session models
+class TransferSessionResponse(BaseModel):
+    session_id: str
+    bin_ms: int
+    expires_at: int
+
+
+class ThroughputPoint(BaseModel):
+    t_ms: int  # bin start, relative to the session start
+    bps: int
+    streams: int  # streams that moved bytes in this bin
+
+
+class TransferDirectionSummary(BaseModel):
+    bytes: int
+    streams: Dict[str, int]  # bytes per stream id
+    duration_seconds: float
+    average_bps: int
+    steady_state_bps: int
+    curve: List[ThroughputPoint]
+
+
+class TransferSessionSummary(BaseModel):
+    session_id: str
+    bin_ms: int
+    download: Optional[TransferDirectionSummary] = None
+    upload: Optional[TransferDirectionSummary] = None
+
+
 # IP Info models
 class IPInfoResponse(BaseModel):
     ip: str
@@ -82,6 +137,11 @@ class ServerInfo(BaseModel):
     flag: str
     endpoint: str
     ping: Optional[float] = None
+    status: str = "healthy"
+    rtt_ms: Optional[float] = None
+    load: Optional[float] = None
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
 
 
 class ServerRegion(BaseModel):
@@ -94,6 +154,16 @@ class ServerRegionsResponse(BaseModel):
     regions: List[ServerRegion]
 
 
+class NearestServer(ServerInfo):
+    distance_km: Optional[float] = None
+
+
+class NearestServersResponse(BaseModel):
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+    servers: List[NearestServer]
+
+
 # Share Card models
 class ShareCardRequest(BaseModel):
     download_mbps: float
@@ -107,8 +177,49 @@ class ShareCardRequest(BaseModel):
     server_region: str
     timestamp: str
     theme: str = "dark"
+    format: Literal["png", "svg"] = "png"
 
 
 class ShareCardResponse(BaseModel):
     image_base64: str
     filename: str
+    media_type: str = "image/png"
+
+
+# Test result history models
+class ResultSubmission(BaseModel):
+    ping: float = Field(ge=0, le=60000, allow_inf_nan=False)  # ms
+    jitter: float = Field(ge=0, le=60000, allow_inf_nan=False)  # ms
+    download_mbps: float = Field(ge=0, le=100000, allow_inf_nan=False)
+    upload_mbps: float = Field(ge=0, le=100000, allow_inf_nan=False)
+    server_region: str = Field(default="auto", max_length=64)
+    asn: str = Field(default="Unknown", max_length=64)
+    country_code: str = Field(default="XX", max_length=8)
+
+
+class ResultAcceptedResponse(BaseModel):
+    overall_score: int
+    grade: str
+
+
+class ResultAggregate(BaseModel):
+    bucket: int
+    asn: Optional[str] = None
+    country: Optional[str] = None
+    server_region: Optional[str] = None
+    count: int
+    ping_avg: float
+    jitter_avg: float
+    download_avg: float
+    upload_avg: float
+    score_avg: float
+    ping_min: float
+    download_max: float
+    upload_max: float
+
+
+class ResultAggregatesResponse(BaseModel):
+    granularity: str
+    since: int
+    until: int
+    aggregates: List[ResultAggregate]
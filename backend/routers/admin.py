@@ -0,0 +1,53 @@
+"""
+Operator-only endpoints, enabled by setting ADMIN_TOKEN.
+"""
+
+import asyncio
+import secrets
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import PlainTextResponse
+from config import get_settings
+from services.profiler import profiler
+
+router = APIRouter(prefix="/admin", tags=["admin"], include_in_schema=False)
+
+settings = get_settings()
+
+
+def require_admin(request: Request):
+    """404 while no ADMIN_TOKEN is configured, 401 unless the bearer token matches."""
+    if not settings.admin_token:
+        raise HTTPException(status_code=404, detail="Not Found")
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not secrets.compare_digest(token.encode(), settings.admin_token.encode()):
+        raise HTTPException(status_code=401, detail="Invalid admin token", headers={"WWW-Authenticate": "Bearer"})
+
+
+@router.post("/profile", response_class=PlainTextResponse)
+async def profile(
+    request: Request,
+    seconds: float = Query(default=10.0, gt=0, le=120),
+    interval_ms: float = Query(default=10.0, ge=1, le=1000),
+    idle: bool = False
+):
+    """
+    Sample this worker's threads for `seconds` and return collapsed stacks
+    for a flamegraph. Sampling runs on its own thread, so it also captures
+    code that blocks the event loop. `idle` keeps stacks of threads that
+    are only waiting for work.
+    """
+    require_admin(request)
+    if profiler.running:
+        raise HTTPException(status_code=409, detail="A profile is already running")
+    try:
+        result = await asyncio.to_thread(
+            profiler.run, seconds, interval_ms / 1000, settings.profiler_max_overhead, idle
+        )
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    return PlainTextResponse(result.collapsed(), headers={
+        "X-Profile-Samples": str(result.samples),
+        "X-Profile-Interval-Ms": f"{result.interval * 1000:.2f}",
+        "X-Profile-Overhead": f"{result.overhead:.4f}",
+    })
@@ -1,17 +1,20 @@
-from fastapi import APIRouter, Request
+from fastapi import APIRouter, Query, Request, Response
+from typing import Optional
 from datetime import datetime
 from models import (
     IPInfoResponse, 
     NetworkQualityRequest, 
     NetworkQualityResponse,
     ServerRegionsResponse,
+    NearestServersResponse,
     ShareCardRequest,
     ShareCardResponse
 )
 from services.ip_service import get_ip_info, extract_asn
 from services.scoring_service import calculate_network_quality
-from services.server_regions import get_all_regions
-from services.card_generator import create_share_card
+from services.server_regions import get_regions_payload, get_nearest_servers, REGIONS_MAX_AGE
+from services.card_generator import create_share_card, CARD_FORMATS
+from services.timing import span
 
 router = APIRouter(tags=["network"])
 
@@ -54,25 +57,26 @@ async def get_ip_information(request: Request):
     # VPN detection
     vpn_detected = geo_data.get("proxy", False) or geo_data.get("hosting", False)
     
-    return IPInfoResponse(
-        ip=client_ip,
-        user_agent=user_agent,
-        accept_language=accept_language,
-        server_time=datetime.utcnow().isoformat(),
-        isp=geo_data.get("isp", "Unknown ISP"),
-        org=geo_data.get("org", ""),
-        asn=asn,
-        city=geo_data.get("city", "Unknown"),
-        region=geo_data.get("regionName", "Unknown"),
-        country=geo_data.get("country", "Unknown"),
-        country_code=geo_data.get("countryCode", "XX"),
-        timezone=geo_data.get("timezone", "Unknown"),
-        ip_type=ip_type,
-        vpn_detected=vpn_detected,
-        reverse_dns="",
-        latitude=geo_data.get("lat"),
-        longitude=geo_data.get("lon")
-    )
+    with span("pydantic"):
+        return IPInfoResponse(
+            ip=client_ip,
+            user_agent=user_agent,
+            accept_language=accept_language,
+            server_time=datetime.utcnow().isoformat(),
+            isp=geo_data.get("isp", "Unknown ISP"),
+            org=geo_data.get("org", ""),
+            asn=asn,
+            city=geo_data.get("city", "Unknown"),
+            region=geo_data.get("regionName", "Unknown"),
+            country=geo_data.get("country", "Unknown"),
+            country_code=geo_data.get("countryCode", "XX"),
+            timezone=geo_data.get("timezone", "Unknown"),
+            ip_type=ip_type,
+            vpn_detected=vpn_detected,
+            reverse_dns="",
+            latitude=geo_data.get("lat"),
+            longitude=geo_data.get("lon")
+        )
 
 
 @router.post("/network-quality", response_model=NetworkQualityResponse)
@@ -97,13 +101,50 @@ async def calculate_quality(request: NetworkQualityRequest):
 async def get_server_regions(request: Request):
     """
     Get available speed test server regions.
+    
+    The response is serialized once per base URL and served with an ETag,
+    so clients can revalidate with If-None-Match and get a 304.
     """
     # Build base URL from request
     base_url = str(request.base_url).rstrip("/")
     
-    regions = get_all_regions(base_url)
+    body, etag = get_regions_payload(base_url)
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={REGIONS_MAX_AGE}",
+    }
+    
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+@router.get("/server-regions/nearest", response_model=NearestServersResponse)
+async def get_nearest_server_regions(
+    request: Request,
+    k: int = Query(default=3, ge=1, le=10),
+    lat: Optional[float] = Query(default=None, ge=-90, le=90),
+    lon: Optional[float] = Query(default=None, ge=-180, le=180)
+):
+    """
+    Get the k nearest healthy servers so the client only needs to probe
+    a few candidates for "Auto (Best)".
+    
+    Uses lat/lon when given (e.g. from a previous /ip-info call),
+    otherwise geolocates the client IP.
+    """
+    if lat is None or lon is None:
+        geo_data = await get_ip_info(get_client_ip(request))
+        lat, lon = geo_data.get("lat"), geo_data.get("lon")
+    
+    base_url = str(request.base_url).rstrip("/")
     
-    return ServerRegionsResponse(regions=regions)
+    return NearestServersResponse(
+        latitude=lat,
+        longitude=lon,
+        servers=get_nearest_servers(lat, lon, base_url, k)
+    )
 
 
 @router.post("/generate-share-card", response_model=ShareCardResponse)
@@ -111,7 +152,8 @@ async def generate_share_card(request: ShareCardRequest):
     """
     Generate a shareable image card with speed test results.
     
-    Returns base64 encoded PNG image.
+    Returns a base64 encoded PNG image, or an SVG document when
+    ``format`` is "svg".
     """
     image_base64, filename = create_share_card(
         download_mbps=request.download_mbps,
@@ -124,10 +166,12 @@ async def generate_share_card(request: ShareCardRequest):
         location=request.location,
         server_region=request.server_region,
         timestamp=request.timestamp,
-        theme=request.theme
+        theme=request.theme,
+        format=request.format
     )
     
     return ShareCardResponse(
         image_base64=image_base64,
-        filename=filename
+        filename=filename,
+        media_type=CARD_FORMATS[request.format]
     )
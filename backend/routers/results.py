@@ -0,0 +1,81 @@
+"""
+Results router — records completed speed tests and serves regional
+performance trends from the hourly/daily rollups.
+"""
+
+import time
+from fastapi import APIRouter, Query
+from typing import List, Literal, Optional
+from models import ResultSubmission, ResultAcceptedResponse, ResultAggregatesResponse
+from services.results_store import ResultsStore
+from services.scoring_service import calculate_network_quality
+
+router = APIRouter(prefix="/results", tags=["results"])
+store = ResultsStore()
+
+# Last second of year 9999; keeps query bounds well inside SQLite's 64-bit integers
+MAX_TIMESTAMP = 253402300799
+
+
+@router.post("", response_model=ResultAcceptedResponse, status_code=202)
+async def submit_result(request: ResultSubmission):
+    """
+    Record a completed speed test. The result is buffered and written in
+    the next batch; aggregates include it after the next rollup.
+    """
+    quality = calculate_network_quality(
+        ping=request.ping,
+        jitter=request.jitter,
+        download_mbps=request.download_mbps,
+        upload_mbps=request.upload_mbps
+    )
+
+    store.record(
+        asn=request.asn,
+        country=request.country_code.upper(),
+        server_region=request.server_region,
+        ping=request.ping,
+        jitter=request.jitter,
+        download_mbps=request.download_mbps,
+        upload_mbps=request.upload_mbps,
+        score=quality["overall_score"]
+    )
+
+    return ResultAcceptedResponse(
+        overall_score=quality["overall_score"],
+        grade=quality["grade"]
+    )
+
+
+@router.get("/aggregates", response_model=ResultAggregatesResponse)
+async def get_result_aggregates(
+    granularity: Literal["hourly", "daily"] = "hourly",
+    since: Optional[int] = Query(default=None, ge=0, le=MAX_TIMESTAMP),
+    until: Optional[int] = Query(default=None, ge=0, le=MAX_TIMESTAMP),
+    asn: Optional[str] = None,
+    country: Optional[str] = None,
+    server_region: Optional[str] = None,
+    group_by: List[Literal["asn", "country", "server_region"]] = Query(default=[])
+):
+    """
+    Aggregated test results per time bucket (epoch seconds), optionally
+    filtered and broken down by ASN, country and server region.
+
+    Defaults to the last 24 hours (hourly) or 30 days (daily).
+    """
+    now = int(time.time())
+    until = until if until is not None else now
+    if since is None:
+        since = until - (86400 if granularity == "hourly" else 30 * 86400)
+
+    filters = {"asn": asn, "country": country.upper() if country else None, "server_region": server_region}
+    aggregates = await store.run(
+        store.query_aggregates, granularity, since, until, filters, list(group_by)
+    )
+
+    return ResultAggregatesResponse(
+        granularity=granularity,
+        since=since,
+        until=until,
+        aggregates=aggregates
+    )
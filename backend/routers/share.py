@@ -1,20 +1,43 @@
 """
 Share router — stores and retrieves shared reports using SQLite.
-Reports expire automatically after 7 days.
+Reports expire automatically after 7 days; expired rows are hidden from
+reads and purged by the sweeper started in the app lifespan.
 """
 
-import uuid
 import json
-from datetime import datetime, timedelta
-from fastapi import APIRouter, HTTPException
+import math
+import time
+from datetime import datetime, timedelta, timezone
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
-from typing import Any
-from services.share_db import ShareDB
+from typing import Any, Dict, Literal
+from services.share_db import ShareDB, CACHE_TTL
+from services.card_generator import render_share_card, CARD_FORMATS
+from services.scoring_service import calculate_network_quality
+from services.timing import span
+from services.metrics import registry as metrics_registry
 
 router = APIRouter(prefix="/share", tags=["share"])
 db = ShareDB()
 
 
+def _cache_stat(field: str):
+    caches = {"response": db.response_cache, "card": db.card_cache}
+    return lambda: {(name,): cache.stats()[field] for name, cache in caches.items()}
+
+
+metrics_registry.callback(
+    "speedtest_share_cache_entries", "Entries held by the share caches", ("cache",), _cache_stat("entries")
+)
+metrics_registry.callback(
+    "speedtest_share_cache_hits_total", "Share cache hits", ("cache",), _cache_stat("hits"), type="counter"
+)
+metrics_registry.callback(
+    "speedtest_share_cache_misses_total", "Share cache misses", ("cache",), _cache_stat("misses"), type="counter"
+)
+
+
 class CreateShareRequest(BaseModel):
     report_data: Any
 
@@ -35,11 +58,11 @@ class SharedReportResponse(BaseModel):
 @router.post("/create", response_model=CreateShareResponse)
 async def create_share_link(request: CreateShareRequest):
     """Create a new shared report link that expires in 7 days."""
-    share_id = uuid.uuid4().hex[:12]
+    share_id = db.new_share_id()
     now = datetime.utcnow()
     expires_at = now + timedelta(days=7)
 
-    db.insert_report(
+    await db.queue_insert(
         share_id=share_id,
         report_data=json.dumps(request.report_data),
         created_at=now.isoformat(),
@@ -53,25 +76,147 @@ async def create_share_link(request: CreateShareRequest):
     )
 
 
+def _expiry_timestamp(expires_at: str) -> float:
+    """Epoch seconds for a stored (naive UTC) expires_at value."""
+    return datetime.fromisoformat(expires_at).replace(tzinfo=timezone.utc).timestamp()
+
+
+def _encode_report(row: Dict[str, Any]) -> bytes:
+    """
+    Serialize a stored row into the SharedReportResponse JSON shape.
+    report_data is already JSON text, so it is spliced in as-is rather
+    than decoded and re-encoded.
+    """
+    return (
+        '{"share_id":%s,"report_data":%s,"expires_at":%s,"created_at":%s}' % (
+            json.dumps(row["share_id"]),
+            row["report_data"],
+            json.dumps(row["expires_at"]),
+            json.dumps(row["created_at"]),
+        )
+    ).encode("utf-8")
+
+
 @router.get("/{share_id}", response_model=SharedReportResponse)
 async def get_shared_report(share_id: str):
     """Retrieve a shared report by its share ID. Returns 404 if expired or not found."""
-    # Clean up expired reports
-    db.cleanup_expired()
-
-    row = db.get_report(share_id)
-    if not row:
-        raise HTTPException(status_code=404, detail="Report not found or expired")
-
-    # Check expiration
-    expires_at = datetime.fromisoformat(row["expires_at"])
-    if datetime.utcnow() > expires_at:
-        db.delete_report(share_id)
-        raise HTTPException(status_code=404, detail="Report has expired")
-
-    return SharedReportResponse(
-        share_id=row["share_id"],
-        report_data=json.loads(row["report_data"]),
-        expires_at=row["expires_at"],
-        created_at=row["created_at"],
+    body = db.response_cache.get(share_id)
+
+    if body is None:
+        # Expired rows are filtered by the query and removed by the background sweeper
+        row = await db.run(db.get_report, share_id)
+        if not row:
+            raise HTTPException(status_code=404, detail="Report not found or expired")
+
+        with span("json.encode"):
+            body = _encode_report(row)
+        expires = min(_expiry_timestamp(row["expires_at"]), time.time() + CACHE_TTL)
+        db.response_cache.set(share_id, body, expires)
+
+    return Response(content=body, media_type="application/json")
+
+
+def _section(data: Dict[str, Any], key: str) -> Dict[str, Any]:
+    value = data.get(key) or {}
+    if not isinstance(value, dict):
+        raise ValueError(f"{key} is not an object")
+    return value
+
+
+def _number(data: Dict[str, Any], key: str) -> float:
+    try:
+        value = float(data.get(key, 0) or 0)
+    except (TypeError, ValueError):
+        raise ValueError(f"{key} is not a number")
+    if not math.isfinite(value):
+        raise ValueError(f"{key} is not finite")
+    return value
+
+
+def _card_fields(report: Any) -> Dict[str, Any]:
+    """
+    Map stored report_data onto create_share_card arguments.
+    Raises ValueError if the report does not have the expected shape.
+    """
+    if not isinstance(report, dict):
+        raise ValueError("report is not an object")
+    speed = _section(report, "speedResult")
+    connection = _section(report, "connection")
+    download = _number(_section(speed, "download"), "speedMbps")
+    upload = _number(_section(speed, "upload"), "speedMbps")
+    ping_data = _section(speed, "ping")
+    ping = _number(ping_data, "latencyMs")
+    jitter = _number(ping_data, "jitterMs")
+
+    quality = calculate_network_quality(
+        ping=ping,
+        jitter=jitter,
+        download_mbps=download,
+        upload_mbps=upload,
     )
+
+    return {
+        "download_mbps": download,
+        "upload_mbps": upload,
+        "ping": ping,
+        "jitter": jitter,
+        "quality_score": quality["overall_score"],
+        "grade": quality["grade"],
+        "isp": str(connection.get("isp") or "Unknown ISP"),
+        "location": str(connection.get("location") or "Unknown"),
+        "server_region": str(report.get("serverRegion") or "Auto"),
+        "timestamp": str(report.get("timestamp") or ""),
+    }
+
+
+@router.get("/{share_id}/card.{format}")
+async def get_shared_report_card(
+    share_id: str,
+    format: Literal["png", "svg"],
+    request: Request,
+    theme: Literal["dark", "light"] = "dark",
+):
+    """
+    Render the share card for a stored report.
+
+    The image is rendered on first request and cached until the report
+    expires; cache headers let crawlers and CDNs reuse it as well.
+    """
+    etag = f'"{share_id}-{theme}.{format}"'
+    # One cache entry per report holds its rendered variants: at most
+    # len(CARD_FORMATS) x 2 themes, since both are validated above
+    cached = db.card_cache.get(share_id)
+    image = cached[0].get((format, theme)) if cached else None
+
+    if image is None:
+        row = await db.run(db.get_report, share_id)
+        if not row:
+            raise HTTPException(status_code=404, detail="Report not found or expired")
+
+        expires = _expiry_timestamp(row["expires_at"])
+        with span("json.decode"):
+            report = json.loads(row["report_data"])
+        try:
+            fields = _card_fields(report)
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=f"Report cannot be rendered as a card: {e}")
+        image = await run_in_threadpool(
+            render_share_card, **fields, theme=theme, format=format
+        )
+        if cached is None:
+            cached = ({}, expires)
+            db.card_cache.set(share_id, cached, expires)
+        cached[0][(format, theme)] = image
+
+    expires = cached[1]
+    max_age = max(0, int(expires - time.time()))
+    headers = {
+        "Cache-Control": f"public, max-age={max_age}, immutable",
+        "Expires": datetime.fromtimestamp(expires, timezone.utc).strftime("%a, %d %b %Y %H:%M:%S GMT"),
+        "ETag": etag,
+    }
+
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+
+    return Response(content=image, media_type=CARD_FORMATS[format], headers=headers)
@@ -1,50 +1,168 @@
 import os
 import time
+import asyncio
 import secrets
-from fastapi import APIRouter, Request, Response
+from typing import Any, Dict, Optional
+from fastapi import APIRouter, HTTPException, Query, Request, Response, WebSocket, WebSocketDisconnect
 from fastapi.responses import StreamingResponse
-from models import PingRequest, PingResponse, UploadResponse
+from pydantic import ValidationError
+from starlette.background import BackgroundTask
+from starlette.concurrency import iterate_in_threadpool
+from config import get_settings
+from models import (
+    PingRequest, PingResponse, UploadResponse, ThroughputCommand,
+    TransferSessionResponse, TransferSessionSummary, TestPlanRequest, TestPlanResponse
+)
+from routers.network import get_client_ip
+from services.admission import AdmissionController, AdmissionRejected, worker_count
+from services.impairment import Impairment, Pacer, impairment_for, IMPAIRMENT_HEADER, IMPAIRMENT_QUERY, PACKET_BYTES
+from services.metrics import bytes_served, bytes_received
+from services.test_sizing import plan_test
+from services.transfer_sessions import TransferSessionStore, StreamRecorder, DEFAULT_BIN_MS, summarize
+from services.fast_json import dumps, parse_body, request_body_schema, ping_response, upload_response
 
 router = APIRouter(prefix="/speedtest", tags=["speedtest"])
 
+settings = get_settings()
+admission = AdmissionController(
+    max_tests=settings.transfer_max_tests,
+    max_bytes_per_sec=settings.transfer_max_bytes_per_sec,
+    queue_timeout=settings.transfer_queue_timeout,
+    lease_seconds=settings.transfer_lease_seconds,
+    ip_rate=settings.transfer_ip_rate,
+    ip_burst=settings.transfer_ip_burst,
+    workers=worker_count(),
+)
+sessions = TransferSessionStore()
 
-@router.post("/ping", response_model=PingResponse)
-async def ping(request: PingRequest):
+
+async def admit_transfer(request: Request) -> str:
+    """Admit a download/upload or answer 429/503 with Retry-After; returns the client IP.
+    Also used for WebSocket phases, which report the HTTPException as an error message."""
+    client_ip = get_client_ip(request)
+    try:
+        await admission.admit(client_ip)
+    except AdmissionRejected as e:
+        raise HTTPException(
+            status_code=e.status_code,
+            detail=e.reason,
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    return client_ip
+
+
+def request_impairment(request: Request) -> Optional[Impairment]:
+    """Emulated link requested by this session, if impairment mode is on.
+    Also accepts a WebSocket; browsers can only pass `impair` in its query string."""
+    if not settings.impairment_enabled:
+        return None
+    token = request.headers.get(IMPAIRMENT_HEADER) or request.query_params.get(IMPAIRMENT_QUERY)
+    try:
+        return impairment_for(token)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+async def session_recorder(session: Optional[str], direction: str, stream: int) -> Optional[StreamRecorder]:
+    """Recorder for a transfer tagged with a session id; 404 if the session is unknown."""
+    if not session:
+        return None
+    found = await sessions.run(sessions.get_session, session)
+    if found is None:
+        raise HTTPException(status_code=404, detail="Transfer session not found or expired")
+    start_ns, bin_ms = found
+    return StreamRecorder(session, direction, stream, start_ns, bin_ms)
+
+
+async def flush_before_last_chunk(chunks, recorder: StreamRecorder):
+    """
+    Pass chunks through, writing the session's bins before the final chunk
+    goes out, so a client that reads the summary as soon as its streams
+    finish sees every byte. If the stream fails first, the bins are still
+    written; a client disconnect is covered by finish_download().
+    """
+    if not hasattr(chunks, "__aiter__"):
+        chunks = iterate_in_threadpool(chunks)
+    previous = None
+    try:
+        async for chunk in chunks:
+            if previous is not None:
+                yield previous
+            previous = chunk
+    finally:
+        await recorder.flush(sessions)
+    if previous is not None:
+        yield previous
+
+
+async def finish_download(client_ip: str, recorder: Optional[StreamRecorder]):
+    """Runs after a download ends, including when the client disconnects."""
+    admission.release(client_ip)
+    if recorder:
+        # Bins still pending belong to an aborted stream
+        await recorder.flush(sessions)
+
+
+@router.post("/ping", response_model=PingResponse, openapi_extra=request_body_schema(PingRequest))
+async def ping(request: Request):
     """
     Measure ping latency.
     Client sends timestamp, server responds with its timestamp.
+    The body is validated from raw bytes and the response is pre-encoded,
+    skipping FastAPI's body parsing and response_model revalidation.
     """
+    body = await parse_body(request, PingRequest)
+    impairment = request_impairment(request)
+    if impairment:
+        # A ping fits in one packet each way
+        await asyncio.sleep(impairment.delay() + impairment.stall(PACKET_BYTES))
     start_time = int(time.time() * 1000)
     server_time = int(time.time() * 1000)
     
-    return PingResponse(
-        seq=request.seq,
-        client_time=request.client_time,
+    response = ping_response(
+        seq=body.seq,
+        client_time=body.client_time,
         server_time=server_time,
         server_process_time=server_time - start_time
     )
+    if impairment:
+        response.headers["X-Impairment"] = impairment.header
+    return response
 
 
 @router.get("/download")
-async def download(size: int = 1048576):
+async def download(
+    request: Request,
+    size: int = 1048576,
+    session: Optional[str] = None,
+    stream: int = Query(default=0, ge=0, le=63)
+):
     """
     Download test endpoint.
     Generates random bytes for download speed measurement.
     
     Args:
         size: Number of bytes to generate (default 1MB, max 10MB)
+        session: Transfer session id grouping parallel streams
+        stream: Stream number within the session
     """
     # Clamp size between 1KB and 10MB
     size = max(1024, min(size, 10 * 1024 * 1024))
+    impairment = request_impairment(request)
+    recorder = await session_recorder(session, "download", stream)
+    client_ip = await admit_transfer(request)
     
-    def generate_chunks():
-        """Generate random data in chunks"""
-        chunk_size = 65536  # 64KB chunks
+    def generate_chunks(chunk_size: int = 65536):
+        """Generate random data in chunks (64KB by default)"""
         remaining = size
         
         while remaining > 0:
             current_chunk = min(chunk_size, remaining)
             yield secrets.token_bytes(current_chunk)
+            bytes_served.inc(amount=current_chunk)
+            admission.record_bytes(current_chunk)
+            if recorder:
+                recorder.add(current_chunk)
             remaining -= current_chunk
     
     headers = {
@@ -54,42 +172,334 @@ async def download(size: int = 1048576):
         "X-Server-Time": str(int(time.time() * 1000)),
         "Cache-Control": "no-store, no-cache, must-revalidate",
     }
+    content = generate_chunks()
+    
+    if impairment:
+        headers["X-Impairment"] = impairment.header
+        down_bps = impairment.profile.down_bps
+        
+        async def impaired_chunks():
+            """Pace chunks to the emulated link after one round trip"""
+            await asyncio.sleep(impairment.delay())
+            pacer = Pacer(impairment, down_bps)
+            for chunk in generate_chunks(impairment.chunk_size(down_bps, 65536)):
+                yield chunk
+                await pacer.transferred(len(chunk))
+        
+        content = impaired_chunks()
+    
+    if recorder:
+        content = flush_before_last_chunk(content, recorder)
     
+    # Runs after the stream ends, including when the client disconnects
     return StreamingResponse(
-        generate_chunks(),
+        content,
         media_type="application/octet-stream",
-        headers=headers
+        headers=headers,
+        background=BackgroundTask(finish_download, client_ip, recorder)
     )
 
 
 @router.post("/upload", response_model=UploadResponse)
-async def upload(request: Request):
+async def upload(
+    request: Request,
+    session: Optional[str] = None,
+    stream: int = Query(default=0, ge=0, le=63)
+):
     """
     Upload test endpoint.
     Receives data and measures upload speed.
+    The body is counted as it streams in and never buffered.
+    `session` and `stream` tag the upload as one stream of a transfer session.
     """
-    start_time = time.time()
-    
-    # Read the entire body
-    body = await request.body()
-    total_bytes = len(body)
-    
-    elapsed = time.time() - start_time
-    
-    # Check max size (50MB)
-    max_size = 50 * 1024 * 1024
-    if total_bytes > max_size:
-        return Response(
-            content='{"error": "Upload too large"}',
-            status_code=413,
-            media_type="application/json"
-        )
+    impairment = request_impairment(request)
+    recorder = await session_recorder(session, "upload", stream)
+    client_ip = await admit_transfer(request)
+    try:
+        start_time = time.time()
+        total_bytes = 0
+        # Reading slower applies backpressure, capping the client's send rate
+        pacer = Pacer(impairment, impairment.profile.up_bps) if impairment else None
+        
+        # Check max size (50MB)
+        max_size = 50 * 1024 * 1024
+        async for chunk in request.stream():
+            total_bytes += len(chunk)
+            bytes_received.inc(amount=len(chunk))
+            admission.record_bytes(len(chunk))
+            if recorder:
+                recorder.add(len(chunk))
+            if total_bytes > max_size:
+                return Response(
+                    content='{"error": "Upload too large"}',
+                    status_code=413,
+                    media_type="application/json"
+                )
+            if pacer:
+                await pacer.transferred(len(chunk))
+        
+        elapsed = time.time() - start_time
+        if impairment:
+            await asyncio.sleep(impairment.delay())
+    finally:
+        admission.release(client_ip)
+        if recorder:
+            await recorder.flush(sessions)
     
     bps = int((total_bytes * 8) / elapsed) if elapsed > 0 else 0
     
-    return UploadResponse(
+    response = upload_response(
         received_bytes=total_bytes,
         elapsed_seconds=elapsed,
         upload_bps=bps,
         server_time=int(time.time() * 1000)
     )
+    if impairment:
+        response.headers["X-Impairment"] = impairment.header
+    return response
+
+
+@router.post("/plan", response_model=TestPlanResponse)
+async def plan(request: TestPlanRequest):
+    """
+    Size a test from a quick pre-probe.
+    The client sends its measured RTT and the time a small transfer took
+    (e.g. a 256KB download); the response gives the stream count, test
+    duration and request size to use, so slow links move few bytes and
+    fast links get enough to reach a stable rate.
+    """
+    return TestPlanResponse(**plan_test(
+        request.direction, request.rtt_ms, request.probe_bytes, request.probe_seconds
+    ))
+
+
+@router.post("/sessions", response_model=TransferSessionResponse)
+async def create_transfer_session(bin_ms: int = Query(default=DEFAULT_BIN_MS, ge=10, le=1000)):
+    """
+    Start a multi-stream transfer session.
+    Pass the returned session_id (plus a stream number per parallel
+    connection) to /download or /upload, then read the combined result
+    from /sessions/{session_id}.
+    """
+    created = await sessions.run(sessions.create, bin_ms)
+    return TransferSessionResponse(
+        session_id=created["session_id"],
+        bin_ms=created["bin_ms"],
+        expires_at=created["expires_at"]
+    )
+
+
+@router.get("/sessions/{session_id}", response_model=TransferSessionSummary)
+async def get_transfer_session(session_id: str):
+    """
+    Aggregate throughput of a transfer session: per-stream bytes, the
+    combined throughput curve over the shared timeline, and the
+    steady-state rate with the ramp-up excluded.
+    """
+    found = await sessions.run(sessions.get_session, session_id)
+    if found is None:
+        raise HTTPException(status_code=404, detail="Transfer session not found or expired")
+    _, bin_ms = found
+    rows = await sessions.run(sessions.get_bins, session_id)
+    return TransferSessionSummary(session_id=session_id, bin_ms=bin_ms, **summarize(rows, bin_ms))
+
+
+# WebSocket throughput test
+# Incompressible payload generated once; every download frame is a slice of it
+WS_PAYLOAD = os.urandom(1024 * 1024)
+WS_MAX_DURATION = 30.0
+
+
+class ThroughputMeter:
+    """Byte counter for one WebSocket phase, producing interval samples."""
+
+    def __init__(self, direction: str, interval: float):
+        self.direction = direction
+        self.interval = interval
+        self.start = time.perf_counter()
+        self.bytes = 0
+        self.frames = 0
+        self.next_sample = self.start + interval
+        self._last_time = self.start
+        self._last_bytes = 0
+
+    def add(self, nbytes: int):
+        self.bytes += nbytes
+        self.frames += 1
+
+    def sample(self) -> Dict[str, Any]:
+        now = time.perf_counter()
+        span_s = now - self._last_time
+        interval_bps = int((self.bytes - self._last_bytes) * 8 / span_s) if span_s > 0 else 0
+        self._last_time, self._last_bytes = now, self.bytes
+        self.next_sample = now + self.interval
+        return {
+            "type": "sample",
+            "direction": self.direction,
+            "bytes": self.bytes,
+            "elapsed_ms": int((now - self.start) * 1000),
+            "bps": interval_bps,
+        }
+
+    def result(self) -> Dict[str, Any]:
+        elapsed = time.perf_counter() - self.start
+        return {
+            "type": "result",
+            "direction": self.direction,
+            "bytes": self.bytes,
+            "frames": self.frames,
+            "elapsed_seconds": elapsed,
+            "bps": int(self.bytes * 8 / elapsed) if elapsed > 0 else 0,
+        }
+
+
+async def send_json_message(websocket: WebSocket, message: Dict[str, Any]):
+    await websocket.send_text(dumps(message).decode("utf-8"))
+
+
+async def ws_download(websocket: WebSocket, command: ThroughputCommand, impairment: Optional[Impairment]):
+    """Stream binary frames until the duration elapses, sampling inline."""
+    frame_size = max(1024, min(command.frame_size, len(WS_PAYLOAD)))
+    pacer = None
+    if impairment:
+        down_bps = impairment.profile.down_bps
+        frame_size = impairment.chunk_size(down_bps, frame_size)
+        await asyncio.sleep(impairment.delay())
+        pacer = Pacer(impairment, down_bps)
+    frame = WS_PAYLOAD[:frame_size]
+
+    meter = ThroughputMeter("download", command.interval_ms / 1000)
+    deadline = meter.start + command.duration
+    while time.perf_counter() < deadline:
+        await websocket.send_bytes(frame)
+        meter.add(frame_size)
+        bytes_served.inc(amount=frame_size)
+        admission.record_bytes(frame_size)
+        if pacer:
+            await pacer.transferred(frame_size)
+        if time.perf_counter() >= meter.next_sample:
+            await send_json_message(websocket, meter.sample())
+    await send_json_message(websocket, meter.result())
+
+
+class UploadPhase:
+    """
+    A running WebSocket upload. The connection's receive loop feeds it frame
+    sizes; a reporter task owns the socket's sending side, emitting samples
+    and the final result once the duration elapses.
+    """
+
+    def __init__(self, websocket: WebSocket, command: ThroughputCommand, impairment: Optional[Impairment], client_ip: str):
+        self.websocket = websocket
+        self.client_ip = client_ip
+        self.meter = ThroughputMeter("upload", command.interval_ms / 1000)
+        self.deadline = self.meter.start + command.duration
+        self.pacer = Pacer(impairment, impairment.profile.up_bps) if impairment else None
+        self.reporter = asyncio.create_task(self._report())
+
+    @property
+    def finished(self) -> bool:
+        return self.reporter.done()
+
+    async def received(self, nbytes: int):
+        self.meter.add(nbytes)
+        bytes_received.inc(amount=nbytes)
+        admission.record_bytes(nbytes)
+        if self.pacer:
+            # Reading slower applies backpressure, capping the client's send rate
+            await self.pacer.transferred(nbytes)
+
+    async def _report(self):
+        try:
+            while True:
+                wake = min(self.meter.next_sample, self.deadline)
+                await asyncio.sleep(max(0.0, wake - time.perf_counter()))
+                if time.perf_counter() >= self.deadline:
+                    break
+                await send_json_message(self.websocket, self.meter.sample())
+            await send_json_message(self.websocket, self.meter.result())
+        finally:
+            admission.release(self.client_ip)
+
+    async def finish(self):
+        """End early (the client sent a message) or wait for the reporter to wrap up."""
+        if not self.reporter.done():
+            self.reporter.cancel()
+            try:
+                await self.reporter
+            except asyncio.CancelledError:
+                pass
+            await send_json_message(self.websocket, self.meter.result())
+        else:
+            await self.reporter
+
+
+@router.websocket("/ws")
+async def throughput_ws(websocket: WebSocket):
+    """
+    WebSocket throughput test: download and upload over one connection.
+
+    The client sends JSON commands as text messages:
+        {"type": "download", "duration": 10, "frame_size": 65536, "interval_ms": 250}
+        {"type": "upload", "duration": 10, "interval_ms": 250}
+
+    Download streams binary frames for `duration` seconds. Upload counts the
+    client's binary frames without keeping them; the client stops sending
+    when it gets the result (or sends any text message to end early). Both
+    report {"type": "sample"} messages every `interval_ms` and end with a
+    {"type": "result"} message. Rejections arrive as {"type": "error"}.
+    """
+    try:
+        impairment = request_impairment(websocket)
+    except HTTPException as e:
+        await websocket.close(code=1008, reason=e.detail)
+        return
+    await websocket.accept()
+
+    upload: Optional[UploadPhase] = None
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            data = message.get("bytes")
+            if data is not None:
+                # Frames arriving after an upload ended are stragglers and dropped
+                if upload and not upload.finished:
+                    await upload.received(len(data))
+                continue
+
+            if upload:
+                await upload.finish()
+                upload = None
+            try:
+                command = ThroughputCommand.model_validate_json(message.get("text") or "")
+            except ValidationError as e:
+                await send_json_message(websocket, {"type": "error", "status": 422, "detail": e.errors(include_url=False)})
+                continue
+            command.duration = max(0.1, min(command.duration, WS_MAX_DURATION))
+            command.interval_ms = max(50, min(command.interval_ms, 5000))
+
+            try:
+                client_ip = await admit_transfer(websocket)
+            except HTTPException as e:
+                await send_json_message(websocket, {
+                    "type": "error",
+                    "status": e.status_code,
+                    "detail": e.detail,
+                    "retry_after": int(e.headers["Retry-After"]),
+                })
+                continue
+
+            if command.type == "upload":
+                upload = UploadPhase(websocket, command, impairment, client_ip)
+                continue
+            try:
+                await ws_download(websocket, command, impairment)
+            finally:
+                admission.release(client_ip)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        if upload and not upload.finished:
+            upload.reporter.cancel()
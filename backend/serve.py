@@ -0,0 +1,67 @@
+"""
+Production entry point.
+
+Runs uvicorn with one worker per available CPU, uvloop and httptools when
+they are installed, and socket/connection limits from config.Settings.
+
+Usage:
+    python serve.py
+"""
+
+import os
+import importlib.util
+import uvicorn
+
+from config import get_settings
+
+
+def available_cpus() -> int:
+    """CPUs this process may use, honouring affinity masks and cgroup v2 quotas."""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            cpus = min(cpus, max(1, int(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return cpus
+
+
+def _installed(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+def main():
+    settings = get_settings()
+    workers = settings.workers or available_cpus()
+    loop = "uvloop" if _installed("uvloop") else "asyncio"
+    http = "httptools" if _installed("httptools") else "h11"
+
+    # Workers inherit this and split host-wide limits (e.g. admission control) by it
+    os.environ["WEB_CONCURRENCY"] = str(workers)
+
+    print(f"Starting {workers} worker(s) on {settings.host}:{settings.port} (loop={loop}, http={http})")
+    uvicorn.run(
+        "main:app",
+        host=settings.host,
+        port=settings.port,
+        workers=workers,
+        loop=loop,
+        http=http,
+        backlog=settings.backlog,
+        timeout_keep_alive=settings.keepalive_timeout,
+        limit_concurrency=settings.limit_concurrency,
+        access_log=settings.access_log,
+        proxy_headers=True,
+        # Throughput test frames are random bytes; compressing them only burns CPU
+        ws_per_message_deflate=False,
+    )
+
+
+if __name__ == "__main__":
+    main()
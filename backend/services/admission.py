@@ -0,0 +1,220 @@
+"""
+Admission control for the transfer endpoints.
+
+Concurrent speed tests share the server's uplink, so admitting too many at
+once gives every user a wrong, low result. The controller admits whole
+tests rather than single requests: a client IP that starts a transfer
+holds a lease that stays valid while it has transfers in flight and for
+`lease_seconds` after, so the follow-up requests of a running test are
+never turned away. New tests wait in a FIFO queue while the worker is at
+capacity (too many tests, or too many bytes/sec) and get 503 + Retry-After
+if no slot frees up within `queue_timeout`. A per-IP token bucket limits
+how fast any one client may start transfers.
+
+Limits are host-wide and split evenly across worker processes.
+"""
+
+import math
+import os
+import time
+import asyncio
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Dict
+
+from services.metrics import registry as metrics_registry
+
+
+# Suggested wait for clients turned away because all test slots are taken
+BUSY_RETRY_AFTER = 10
+QUEUE_POLL_INTERVAL = 0.05
+
+admission_decisions = metrics_registry.counter(
+    "speedtest_admission_total",
+    "Transfer admission decisions (admitted, queued, busy, rate_limited)",
+    ("outcome",)
+)
+
+
+def worker_count() -> int:
+    """Worker processes sharing the host-wide limits (set by serve.py)."""
+    return max(1, int(os.environ.get("WEB_CONCURRENCY", "1")))
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, status_code: int, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.status_code = status_code  # 429 when rate limited, 503 when busy
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class RateMeter:
+    """Bytes/sec over a sliding window, kept in fixed time slots."""
+
+    def __init__(self, window: float = 1.0, slots: int = 10):
+        self.window = window
+        self.slot_width = window / slots
+        self._counts = [0] * slots
+        self._slot = 0
+
+    def _advance(self, now: float) -> int:
+        slot = int(now / self.slot_width)
+        if slot != self._slot:
+            # Zero every slot that elapsed since the last update
+            for i in range(self._slot + 1, min(slot, self._slot + len(self._counts)) + 1):
+                self._counts[i % len(self._counts)] = 0
+            self._slot = slot
+        return slot
+
+    def add(self, amount: int):
+        slot = self._advance(time.monotonic())
+        self._counts[slot % len(self._counts)] += amount
+
+    def rate(self) -> float:
+        self._advance(time.monotonic())
+        return sum(self._counts) / self.window
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def take(self) -> float:
+        """Take one token; returns 0 on success, else seconds until one is available."""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def idle(self, now: float) -> bool:
+        """True once the bucket would have refilled completely."""
+        return self.tokens + (now - self.updated) * self.rate >= self.burst
+
+
+@dataclass
+class Lease:
+    active: int = 0
+    idle_since: float = 0.0
+
+
+class AdmissionController:
+    def __init__(
+        self,
+        max_tests: int = 0,
+        max_bytes_per_sec: int = 0,
+        queue_timeout: float = 5.0,
+        lease_seconds: float = 5.0,
+        ip_rate: float = 0.0,
+        ip_burst: int = 64,
+        workers: int = 1
+    ):
+        # Host-wide limits, split across workers (0 = unlimited)
+        self.max_tests = math.ceil(max_tests / workers) if max_tests else 0
+        self.max_bytes_per_sec = max_bytes_per_sec / workers if max_bytes_per_sec else 0
+        self.queue_timeout = queue_timeout
+        self.lease_seconds = lease_seconds
+        self.ip_rate = ip_rate
+        self.ip_burst = ip_burst
+
+        self.active_transfers = 0
+        self.meter = RateMeter()
+        self._leases: Dict[str, Lease] = {}
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._queue: Deque[object] = deque()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.max_tests or self.max_bytes_per_sec)
+
+    def _prune(self, now: float):
+        expired = [
+            ip for ip, lease in self._leases.items()
+            if not lease.active and now - lease.idle_since > self.lease_seconds
+        ]
+        for ip in expired:
+            del self._leases[ip]
+        if len(self._buckets) > 10000:
+            self._buckets = {ip: b for ip, b in self._buckets.items() if not b.idle(now)}
+
+    def has_capacity(self) -> bool:
+        self._prune(time.monotonic())
+        if self.max_tests and len(self._leases) >= self.max_tests:
+            return False
+        if self.max_bytes_per_sec and self.meter.rate() >= self.max_bytes_per_sec:
+            return False
+        return True
+
+    def load(self) -> float:
+        """Utilization of the tighter limit, 0..1 (0 when unlimited)."""
+        self._prune(time.monotonic())
+        load = 0.0
+        if self.max_tests:
+            load = max(load, len(self._leases) / self.max_tests)
+        if self.max_bytes_per_sec:
+            load = max(load, self.meter.rate() / self.max_bytes_per_sec)
+        return min(1.0, load)
+
+    def _check_rate(self, client_ip: str):
+        if not self.ip_rate:
+            return
+        bucket = self._buckets.get(client_ip)
+        if bucket is None:
+            bucket = self._buckets[client_ip] = TokenBucket(self.ip_rate, self.ip_burst)
+        wait = bucket.take()
+        if wait:
+            admission_decisions.inc("rate_limited")
+            raise AdmissionRejected(429, "Too many transfers from this address", max(1, math.ceil(wait)))
+
+    async def admit(self, client_ip: str):
+        """
+        Admit one transfer for `client_ip`, waiting in the queue if needed.
+        Raises AdmissionRejected when rate limited or still at capacity after
+        `queue_timeout`. Every successful admit must be paired with release().
+        """
+        self._check_rate(client_ip)
+        self._prune(time.monotonic())
+
+        lease = self._leases.get(client_ip)
+        if lease is None and not (self.has_capacity() and not self._queue):
+            # A new test while at capacity: wait our turn
+            admission_decisions.inc("queued")
+            ticket = object()
+            self._queue.append(ticket)
+            deadline = time.monotonic() + self.queue_timeout
+            try:
+                # Leave early if another transfer of the same test got in meanwhile
+                while client_ip not in self._leases and not (self._queue[0] is ticket and self.has_capacity()):
+                    if time.monotonic() >= deadline:
+                        admission_decisions.inc("busy")
+                        slots_full = self.max_tests and len(self._leases) >= self.max_tests
+                        # Bandwidth frees up within a second; a test slot takes a whole test
+                        retry_after = BUSY_RETRY_AFTER if slots_full else 1
+                        raise AdmissionRejected(503, "Server is busy with other speed tests", retry_after)
+                    await asyncio.sleep(QUEUE_POLL_INTERVAL)
+            finally:
+                self._queue.remove(ticket)
+            lease = self._leases.get(client_ip)
+
+        if lease is None:
+            lease = self._leases[client_ip] = Lease()
+        lease.active += 1
+        self.active_transfers += 1
+        admission_decisions.inc("admitted")
+
+    def release(self, client_ip: str):
+        self.active_transfers -= 1
+        lease = self._leases.get(client_ip)
+        if lease is not None:
+            lease.active -= 1
+            if not lease.active:
+                lease.idle_since = time.monotonic()
+
+    def record_bytes(self, amount: int):
+        self.meter.add(amount)
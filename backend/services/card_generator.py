@@ -1,11 +1,70 @@
 import io
+import time
 import base64
 from datetime import datetime
-from PIL import Image, ImageDraw, ImageFont
-from typing import Tuple
+from xml.sax.saxutils import escape
+from typing import Dict, List, Tuple, TYPE_CHECKING
+from services.metrics import card_render_seconds
+from services.timing import span
 
+if TYPE_CHECKING:
+    from PIL import ImageFont
 
-def create_share_card(
+
+# Card dimensions (social media optimized)
+CARD_WIDTH, CARD_HEIGHT = 1200, 630
+CARD_PADDING = 40
+
+# Supported output formats and their media types
+CARD_FORMATS: Dict[str, str] = {
+    "png": "image/png",
+    "svg": "image/svg+xml",
+}
+
+# Theme colors
+THEMES: Dict[str, Dict[str, Tuple[int, int, int]]] = {
+    "dark": {
+        "bg_color": (17, 24, 39),  # Dark blue-gray
+        "card_bg": (31, 41, 55),  # Slightly lighter
+        "text_primary": (255, 255, 255),
+        "text_secondary": (156, 163, 175),
+        "accent_color": (59, 130, 246),  # Blue
+        "download_color": (34, 197, 94),  # Green
+        "upload_color": (168, 85, 247),  # Purple
+    },
+    "light": {
+        "bg_color": (249, 250, 251),
+        "card_bg": (255, 255, 255),
+        "text_primary": (17, 24, 39),
+        "text_secondary": (107, 114, 128),
+        "accent_color": (59, 130, 246),
+        "download_color": (34, 197, 94),
+        "upload_color": (168, 85, 247),
+    },
+}
+
+# Grade badge colors
+GRADE_COLORS: Dict[str, Tuple[int, int, int]] = {
+    "A+": (34, 197, 94),
+    "A": (34, 197, 94),
+    "B": (234, 179, 8),
+    "C": (249, 115, 22),
+    "D": (239, 68, 68),
+    "F": (239, 68, 68)
+}
+
+# Fonts: (path, size, bold) per size name
+FONT_BOLD_PATH = "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf"
+FONT_REGULAR_PATH = "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf"
+FONTS: Dict[str, Tuple[str, int, bool]] = {
+    "large": (FONT_BOLD_PATH, 72, True),
+    "medium": (FONT_BOLD_PATH, 36, True),
+    "small": (FONT_REGULAR_PATH, 24, False),
+    "tiny": (FONT_REGULAR_PATH, 18, False),
+}
+
+
+def _build_layout(
     download_mbps: float,
     upload_mbps: float,
     ping: float,
@@ -16,142 +75,259 @@ def create_share_card(
     location: str,
     server_region: str,
     timestamp: str,
-    theme: str = "dark"
-) -> Tuple[str, str]:
+    theme: str
+) -> List[Tuple]:
     """
-    Generate a shareable speed test result card as a PNG image.
-    
-    Returns:
-        Tuple of (base64_encoded_image, filename)
+    Describe the card as a list of drawing primitives shared by every backend.
+
+    Each primitive is one of:
+        ("rect", box, fill, outline, outline_width)
+        ("ellipse", box, fill)
+        ("line", points, fill, width)
+        ("text", (x, y), text, fill, font_name)
     """
-    
-    # Card dimensions (social media optimized)
-    width, height = 1200, 630
-    
-    # Theme colors
-    if theme == "dark":
-        bg_color = (17, 24, 39)  # Dark blue-gray
-        card_bg = (31, 41, 55)  # Slightly lighter
-        text_primary = (255, 255, 255)
-        text_secondary = (156, 163, 175)
-        accent_color = (59, 130, 246)  # Blue
-        download_color = (34, 197, 94)  # Green
-        upload_color = (168, 85, 247)  # Purple
-    else:
-        bg_color = (249, 250, 251)
-        card_bg = (255, 255, 255)
-        text_primary = (17, 24, 39)
-        text_secondary = (107, 114, 128)
-        accent_color = (59, 130, 246)
-        download_color = (34, 197, 94)
-        upload_color = (168, 85, 247)
-    
-    # Create image
-    img = Image.new('RGB', (width, height), bg_color)
-    draw = ImageDraw.Draw(img)
-    
-    # Try to use a nice font, fallback to default
-    try:
-        font_large = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", 72)
-        font_medium = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", 36)
-        font_small = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", 24)
-        font_tiny = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", 18)
-    except:
-        font_large = ImageFont.load_default()
-        font_medium = ImageFont.load_default()
-        font_small = ImageFont.load_default()
-        font_tiny = ImageFont.load_default()
-    
-    # Draw main card background with rounded corners effect
-    padding = 40
-    draw.rectangle(
-        [padding, padding, width - padding, height - padding],
-        fill=card_bg,
-        outline=accent_color,
-        width=2
-    )
-    
-    # Header - Title
-    title = "Speed Test Results"
-    draw.text((80, 70), title, fill=accent_color, font=font_medium)
-    
+    colors = THEMES.get(theme, THEMES["light"])
+    text_primary = colors["text_primary"]
+    text_secondary = colors["text_secondary"]
+    accent_color = colors["accent_color"]
+    width, height, padding = CARD_WIDTH, CARD_HEIGHT, CARD_PADDING
+
+    ops: List[Tuple] = [
+        ("rect", (0, 0, width, height), colors["bg_color"], None, 0),
+        # Main card background
+        ("rect", (padding, padding, width - padding, height - padding),
+         colors["card_bg"], accent_color, 2),
+        # Header - Title
+        ("text", (80, 70), "Speed Test Results", accent_color, "medium"),
+    ]
+
     # Grade badge
-    grade_colors = {
-        "A+": (34, 197, 94),
-        "A": (34, 197, 94),
-        "B": (234, 179, 8),
-        "C": (249, 115, 22),
-        "D": (239, 68, 68),
-        "F": (239, 68, 68)
-    }
-    grade_color = grade_colors.get(grade, accent_color)
-    
-    # Draw grade circle
+    grade_color = GRADE_COLORS.get(grade, accent_color)
     grade_x, grade_y = 1050, 100
-    draw.ellipse([grade_x - 50, grade_y - 50, grade_x + 50, grade_y + 50], fill=grade_color)
-    draw.text((grade_x - 25, grade_y - 30), grade, fill=(255, 255, 255), font=font_medium)
-    
-    # Score text
-    draw.text((grade_x - 35, grade_y + 60), f"Score: {quality_score}", fill=text_secondary, font=font_tiny)
-    
+    ops += [
+        ("ellipse", (grade_x - 50, grade_y - 50, grade_x + 50, grade_y + 50), grade_color),
+        ("text", (grade_x - 25, grade_y - 30), grade, (255, 255, 255), "medium"),
+        ("text", (grade_x - 35, grade_y + 60), f"Score: {quality_score}", text_secondary, "tiny"),
+    ]
+
     # Main metrics section
     metrics_y = 180
-    
-    # Download speed
-    draw.text((80, metrics_y), "↓ DOWNLOAD", fill=download_color, font=font_small)
-    draw.text((80, metrics_y + 40), f"{download_mbps:.1f}", fill=text_primary, font=font_large)
-    draw.text((280, metrics_y + 80), "Mbps", fill=text_secondary, font=font_small)
-    
-    # Upload speed
-    draw.text((450, metrics_y), "↑ UPLOAD", fill=upload_color, font=font_small)
-    draw.text((450, metrics_y + 40), f"{upload_mbps:.1f}", fill=text_primary, font=font_large)
-    draw.text((630, metrics_y + 80), "Mbps", fill=text_secondary, font=font_small)
-    
-    # Ping
-    draw.text((800, metrics_y), "PING", fill=accent_color, font=font_small)
-    draw.text((800, metrics_y + 40), f"{ping:.0f}", fill=text_primary, font=font_large)
-    draw.text((920, metrics_y + 80), "ms", fill=text_secondary, font=font_small)
-    
-    # Jitter
-    draw.text((1000, metrics_y), "JITTER", fill=text_secondary, font=font_small)
-    draw.text((1000, metrics_y + 40), f"{jitter:.1f}", fill=text_primary, font=font_medium)
-    draw.text((1080, metrics_y + 60), "ms", fill=text_secondary, font=font_tiny)
-    
+    ops += [
+        # Download speed
+        ("text", (80, metrics_y), "↓ DOWNLOAD", colors["download_color"], "small"),
+        ("text", (80, metrics_y + 40), f"{download_mbps:.1f}", text_primary, "large"),
+        ("text", (280, metrics_y + 80), "Mbps", text_secondary, "small"),
+        # Upload speed
+        ("text", (450, metrics_y), "↑ UPLOAD", colors["upload_color"], "small"),
+        ("text", (450, metrics_y + 40), f"{upload_mbps:.1f}", text_primary, "large"),
+        ("text", (630, metrics_y + 80), "Mbps", text_secondary, "small"),
+        # Ping
+        ("text", (800, metrics_y), "PING", accent_color, "small"),
+        ("text", (800, metrics_y + 40), f"{ping:.0f}", text_primary, "large"),
+        ("text", (920, metrics_y + 80), "ms", text_secondary, "small"),
+        # Jitter
+        ("text", (1000, metrics_y), "JITTER", text_secondary, "small"),
+        ("text", (1000, metrics_y + 40), f"{jitter:.1f}", text_primary, "medium"),
+        ("text", (1080, metrics_y + 60), "ms", text_secondary, "tiny"),
+    ]
+
     # Divider line
-    draw.line([(80, 350), (width - 80, 350)], fill=text_secondary, width=1)
-    
+    ops.append(("line", ((80, 350), (width - 80, 350)), text_secondary, 1))
+
     # Info section
     info_y = 380
-    
-    # ISP
-    draw.text((80, info_y), "ISP:", fill=text_secondary, font=font_small)
-    draw.text((150, info_y), isp[:40], fill=text_primary, font=font_small)
-    
-    # Location
-    draw.text((80, info_y + 45), "Location:", fill=text_secondary, font=font_small)
-    draw.text((200, info_y + 45), location[:35], fill=text_primary, font=font_small)
-    
-    # Server
-    draw.text((650, info_y), "Server:", fill=text_secondary, font=font_small)
-    draw.text((750, info_y), server_region[:25], fill=text_primary, font=font_small)
-    
-    # Timestamp
-    draw.text((650, info_y + 45), "Tested:", fill=text_secondary, font=font_small)
-    draw.text((750, info_y + 45), timestamp[:25], fill=text_primary, font=font_small)
-    
+    ops += [
+        ("text", (80, info_y), "ISP:", text_secondary, "small"),
+        ("text", (150, info_y), isp[:40], text_primary, "small"),
+        ("text", (80, info_y + 45), "Location:", text_secondary, "small"),
+        ("text", (200, info_y + 45), location[:35], text_primary, "small"),
+        ("text", (650, info_y), "Server:", text_secondary, "small"),
+        ("text", (750, info_y), server_region[:25], text_primary, "small"),
+        ("text", (650, info_y + 45), "Tested:", text_secondary, "small"),
+        ("text", (750, info_y + 45), timestamp[:25], text_primary, "small"),
+    ]
+
     # Footer branding
-    draw.text((80, height - 80), "SpeedTest Dashboard", fill=accent_color, font=font_small)
-    draw.text((width - 280, height - 80), "speedtest.app", fill=text_secondary, font=font_small)
-    
-    # Convert to base64
+    ops += [
+        ("text", (80, height - 80), "SpeedTest Dashboard", accent_color, "small"),
+        ("text", (width - 280, height - 80), "speedtest.app", text_secondary, "small"),
+    ]
+
+    return ops
+
+
+def _load_fonts() -> Dict[str, "ImageFont.ImageFont"]:
+    """Load the card fonts, falling back to the PIL default font"""
+    from PIL import ImageFont
+
+    try:
+        return {
+            name: ImageFont.truetype(path, size)
+            for name, (path, size, _) in FONTS.items()
+        }
+    except Exception:
+        default = ImageFont.load_default()
+        return {name: default for name in FONTS}
+
+
+def _render_png(ops: List[Tuple]) -> bytes:
+    """Rasterize layout primitives into PNG bytes with Pillow"""
+    # Pillow is imported on the first PNG render rather than at startup
+    from PIL import Image, ImageDraw
+
+    img = Image.new('RGB', (CARD_WIDTH, CARD_HEIGHT))
+    draw = ImageDraw.Draw(img)
+    fonts = _load_fonts()
+
+    for op in ops:
+        kind = op[0]
+        if kind == "rect":
+            _, box, fill, outline, outline_width = op
+            draw.rectangle(box, fill=fill, outline=outline, width=outline_width)
+        elif kind == "ellipse":
+            _, box, fill = op
+            draw.ellipse(box, fill=fill)
+        elif kind == "line":
+            _, points, fill, line_width = op
+            draw.line(points, fill=fill, width=line_width)
+        elif kind == "text":
+            _, xy, text, fill, font = op
+            draw.text(xy, text, fill=fill, font=fonts[font])
+
     buffer = io.BytesIO()
     img.save(buffer, format='PNG', quality=95)
-    buffer.seek(0)
-    
-    base64_image = base64.b64encode(buffer.getvalue()).decode('utf-8')
-    
+    return buffer.getvalue()
+
+
+def _svg_color(color: Tuple[int, int, int]) -> str:
+    return "#%02x%02x%02x" % color
+
+
+def _render_svg(ops: List[Tuple]) -> bytes:
+    """Serialize layout primitives into an SVG document without touching Pillow"""
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{CARD_WIDTH}" height="{CARD_HEIGHT}" '
+        f'viewBox="0 0 {CARD_WIDTH} {CARD_HEIGHT}" font-family="DejaVu Sans, Verdana, sans-serif">'
+    ]
+
+    for op in ops:
+        kind = op[0]
+        if kind == "rect":
+            _, (x0, y0, x1, y1), fill, outline, outline_width = op
+            stroke = (
+                f' stroke="{_svg_color(outline)}" stroke-width="{outline_width}"'
+                if outline else ""
+            )
+            parts.append(
+                f'<rect x="{x0}" y="{y0}" width="{x1 - x0}" height="{y1 - y0}" '
+                f'fill="{_svg_color(fill)}"{stroke}/>'
+            )
+        elif kind == "ellipse":
+            _, (x0, y0, x1, y1), fill = op
+            parts.append(
+                f'<ellipse cx="{(x0 + x1) / 2:g}" cy="{(y0 + y1) / 2:g}" '
+                f'rx="{(x1 - x0) / 2:g}" ry="{(y1 - y0) / 2:g}" fill="{_svg_color(fill)}"/>'
+            )
+        elif kind == "line":
+            _, ((x0, y0), (x1, y1)), fill, line_width = op
+            parts.append(
+                f'<line x1="{x0}" y1="{y0}" x2="{x1}" y2="{y1}" '
+                f'stroke="{_svg_color(fill)}" stroke-width="{line_width}"/>'
+            )
+        elif kind == "text":
+            _, (x, y), text, fill, font = op
+            _, size, bold = FONTS[font]
+            weight = ' font-weight="bold"' if bold else ""
+            # PIL anchors text at its top-left corner; "hanging" matches that in SVG
+            parts.append(
+                f'<text x="{x}" y="{y}" font-size="{size}"{weight} '
+                f'dominant-baseline="hanging" fill="{_svg_color(fill)}">{escape(text)}</text>'
+            )
+
+    parts.append("</svg>")
+    return "".join(parts).encode("utf-8")
+
+
+_RENDERERS = {
+    "png": _render_png,
+    "svg": _render_svg,
+}
+
+
+def render_share_card(
+    download_mbps: float,
+    upload_mbps: float,
+    ping: float,
+    jitter: float,
+    quality_score: int,
+    grade: str,
+    isp: str,
+    location: str,
+    server_region: str,
+    timestamp: str,
+    theme: str = "dark",
+    format: str = "png"
+) -> bytes:
+    """
+    Render a shareable speed test result card to raw image bytes.
+
+    ``format`` selects the backend: "png" rasterizes with Pillow, "svg"
+    emits a vector document from the same layout.
+    """
+    if format not in _RENDERERS:
+        raise ValueError(f"Unsupported card format: {format}")
+
+    start = time.perf_counter()
+    with span("card.layout"):
+        ops = _build_layout(
+            download_mbps, upload_mbps, ping, jitter, quality_score, grade,
+            isp, location, server_region, timestamp, theme
+        )
+    with span(f"card.{format}"):
+        image = _RENDERERS[format](ops)
+    card_render_seconds.observe(time.perf_counter() - start, format)
+    return image
+
+
+def create_share_card(
+    download_mbps: float,
+    upload_mbps: float,
+    ping: float,
+    jitter: float,
+    quality_score: int,
+    grade: str,
+    isp: str,
+    location: str,
+    server_region: str,
+    timestamp: str,
+    theme: str = "dark",
+    format: str = "png"
+) -> Tuple[str, str]:
+    """
+    Generate a shareable speed test result card as a PNG or SVG image.
+
+    Returns:
+        Tuple of (base64_encoded_image, filename)
+    """
+    image_bytes = render_share_card(
+        download_mbps=download_mbps,
+        upload_mbps=upload_mbps,
+        ping=ping,
+        jitter=jitter,
+        quality_score=quality_score,
+        grade=grade,
+        isp=isp,
+        location=location,
+        server_region=server_region,
+        timestamp=timestamp,
+        theme=theme,
+        format=format
+    )
+
+    base64_image = base64.b64encode(image_bytes).decode('utf-8')
+
     # Generate filename
     dt = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"speedtest_result_{dt}.png"
-    
+    filename = f"speedtest_result_{dt}.{format}"
+
     return base64_image, filename
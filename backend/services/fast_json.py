@@ -0,0 +1,82 @@
+"""
+Fast JSON encoding for hot endpoints.
+
+`FastJSONResponse` encodes with orjson when it is installed and falls back
+to a compact stdlib encoding otherwise. Fixed-shape responses that we build
+ourselves (ping, upload) skip response-model validation entirely and are
+rendered from pre-encoded byte templates; `parse_body` validates a request
+body straight from its raw bytes with pydantic-core.
+"""
+
+import json
+from typing import Any, Dict, Type, TypeVar
+from fastapi import Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel, ValidationError
+
+try:
+    import orjson
+except ImportError:  # optional, the stdlib encoder is used when unavailable
+    orjson = None
+
+
+JSON_MEDIA_TYPE = "application/json"
+
+# Byte templates for fixed-shape responses; field order matches the models
+PING_TEMPLATE = b'{"seq":%d,"client_time":%d,"server_time":%d,"server_process_time":%d}'
+UPLOAD_TEMPLATE = b'{"received_bytes":%d,"elapsed_seconds":%s,"upload_bps":%d,"server_time":%d}'
+
+M = TypeVar("M", bound=BaseModel)
+
+
+def dumps(content: Any) -> bytes:
+    """Encode a JSON-compatible value to compact UTF-8 bytes."""
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+async def parse_body(request: Request, model: Type[M]) -> M:
+    """
+    Validate a JSON request body against `model` in one pass. Errors are
+    raised as the same 422 FastAPI produces for declared body parameters.
+    """
+    try:
+        return model.model_validate_json(await request.body())
+    except ValidationError as e:
+        raise RequestValidationError([
+            {**error, "loc": ("body", *error["loc"])}
+            for error in e.errors(include_url=False)
+        ])
+
+
+def request_body_schema(model: Type[BaseModel]) -> Dict[str, Any]:
+    """openapi_extra documenting a body read with parse_body()."""
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {JSON_MEDIA_TYPE: {"schema": model.model_json_schema()}},
+        }
+    }
+
+
+def ping_response(seq: int, client_time: int, server_time: int, server_process_time: int) -> Response:
+    """Serialized PingResponse without building or validating the model."""
+    return Response(
+        PING_TEMPLATE % (seq, client_time, server_time, server_process_time),
+        media_type=JSON_MEDIA_TYPE
+    )
+
+
+def upload_response(received_bytes: int, elapsed_seconds: float, upload_bps: int, server_time: int) -> Response:
+    """Serialized UploadResponse without building or validating the model."""
+    return Response(
+        UPLOAD_TEMPLATE % (received_bytes, repr(float(elapsed_seconds)).encode(), upload_bps, server_time),
+        media_type=JSON_MEDIA_TYPE
+    )
@@ -0,0 +1,206 @@
+"""
+Network impairment emulation for the speed test endpoints.
+
+An opt-in mode (IMPAIRMENT_ENABLED) that lets a client ask for a bad link
+per session, through the `X-Impairment` header or the `impair` query
+parameter. The token names a profile and/or overrides its fields:
+
+    3g
+    lte,seed=42
+    down=10mbit,up=2mbit,latency=40,jitter=8,dist=normal,loss=0.01,seed=7
+
+Fields: `down`/`up` bandwidth caps (bits/sec, with optional kbit/mbit/gbit
+suffix), `latency` added round-trip ms, `jitter` ms with `dist` uniform,
+normal or pareto, `loss` probability per 1460-byte packet, and `seed` for
+reproducible runs. Bandwidth caps must be 0 (uncapped) or 8kbit-100gbit,
+and latency and jitter at most 5000 ms. Over HTTP a lost packet is
+retransmitted, so loss shows up as retransmission-timeout stalls rather
+than missing data.
+
+Sessions are keyed by the token. All requests with the same token share
+one random generator, so a seeded token replays the same delays and stalls
+when its requests arrive in the same order. Add `session=<id>` to start a
+fresh session with an otherwise identical token.
+"""
+
+import math
+import time
+import random
+import asyncio
+from dataclasses import dataclass, replace, fields
+from typing import Dict, Optional
+
+from services.ttl_cache import TTLCache
+
+
+IMPAIRMENT_HEADER = "x-impairment"
+IMPAIRMENT_QUERY = "impair"
+PACKET_BYTES = 1460
+MIN_RTO = 0.2  # Linux minimum retransmission timeout, seconds
+SESSION_TTL = 3600
+JITTER_DISTRIBUTIONS = ("uniform", "normal", "pareto")
+
+
+@dataclass(frozen=True)
+class ImpairmentProfile:
+    down_bps: float = 0.0  # 0 = uncapped
+    up_bps: float = 0.0
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    dist: str = "uniform"
+    loss: float = 0.0
+    seed: Optional[int] = None
+
+
+PROFILES: Dict[str, ImpairmentProfile] = {
+    "edge": ImpairmentProfile(down_bps=240e3, up_bps=200e3, latency_ms=400, jitter_ms=80, loss=0.02),
+    "3g": ImpairmentProfile(down_bps=1.6e6, up_bps=768e3, latency_ms=150, jitter_ms=30, loss=0.01),
+    "lte": ImpairmentProfile(down_bps=12e6, up_bps=5e6, latency_ms=50, jitter_ms=10, loss=0.002),
+    "dsl": ImpairmentProfile(down_bps=8e6, up_bps=1e6, latency_ms=30, jitter_ms=5),
+    "satellite": ImpairmentProfile(down_bps=20e6, up_bps=3e6, latency_ms=600, jitter_ms=40, dist="pareto", loss=0.01),
+    "lossy-wifi": ImpairmentProfile(down_bps=30e6, up_bps=15e6, latency_ms=20, jitter_ms=15, dist="normal", loss=0.05),
+}
+
+# field -> (smallest non-zero value, largest value). Caps keep a session
+# from stalling a transfer, and the admission slot it holds, indefinitely.
+LIMITS = {
+    "down_bps": (8e3, 100e9),
+    "up_bps": (8e3, 100e9),
+    "latency_ms": (0.0, 5000.0),
+    "jitter_ms": (0.0, 5000.0),
+}
+
+_RATE_UNITS = {"kbit": 1e3, "mbit": 1e6, "gbit": 1e9, "bit": 1.0}
+_FIELD_ALIASES = {"down": "down_bps", "up": "up_bps", "latency": "latency_ms", "jitter": "jitter_ms"}
+
+
+def _parse_rate(value: str) -> float:
+    value = value.lower()
+    for suffix, scale in _RATE_UNITS.items():
+        if value.endswith(suffix):
+            return float(value[:-len(suffix)]) * scale
+    return float(value)
+
+
+def parse_token(token: str) -> ImpairmentProfile:
+    """Parse an impairment token into a profile; raises ValueError if malformed."""
+    profile = ImpairmentProfile()
+    overrides = {}
+    for part in filter(None, (p.strip() for p in token.split(","))):
+        if "=" not in part:
+            if part not in PROFILES:
+                raise ValueError(f"Unknown impairment profile: {part}")
+            profile = PROFILES[part]
+            continue
+        key, value = (s.strip() for s in part.split("=", 1))
+        name = _FIELD_ALIASES.get(key, key)
+        if name in ("down_bps", "up_bps"):
+            overrides[name] = _parse_rate(value)
+        elif name in ("latency_ms", "jitter_ms", "loss"):
+            overrides[name] = float(value)
+        elif name == "dist":
+            if value not in JITTER_DISTRIBUTIONS:
+                raise ValueError(f"Unknown jitter distribution: {value}")
+            overrides[name] = value
+        elif name == "seed":
+            overrides[name] = int(value)
+        elif name == "session":
+            continue  # only distinguishes sessions
+        else:
+            raise ValueError(f"Unknown impairment field: {key}")
+
+    profile = replace(profile, **overrides)
+    if not 0 <= profile.loss < 1:
+        raise ValueError("loss must be in [0, 1)")
+    for name, (low, high) in LIMITS.items():
+        value = getattr(profile, name)
+        if not math.isfinite(value) or value < 0 or value > high:
+            raise ValueError(f"{name} must be between 0 and {high:g}")
+        if 0 < value < low:
+            raise ValueError(f"{name} must be 0 or at least {low:g}")
+    return profile
+
+
+def describe(profile: ImpairmentProfile) -> str:
+    """Normalized token for a profile, echoed back to clients."""
+    parts = []
+    for f in fields(profile):
+        value = getattr(profile, f.name)
+        if value != f.default:
+            parts.append(f"{f.name}={value:g}" if isinstance(value, float) else f"{f.name}={value}")
+    return ",".join(parts) or "none"
+
+
+class Impairment:
+    """One emulated link: a profile plus the session's random generator."""
+
+    def __init__(self, profile: ImpairmentProfile):
+        self.profile = profile
+        self.rng = random.Random(profile.seed)
+        self.header = describe(profile)
+
+    def delay(self) -> float:
+        """Added round-trip delay in seconds: latency plus a jitter sample."""
+        p = self.profile
+        if not p.jitter_ms:
+            return p.latency_ms / 1000
+        if p.dist == "normal":
+            jitter = self.rng.gauss(0, p.jitter_ms)
+        elif p.dist == "pareto":
+            # Heavy tail: mostly small, occasionally many times the jitter
+            jitter = p.jitter_ms * (self.rng.paretovariate(2.5) - 1)
+        else:
+            jitter = self.rng.uniform(-p.jitter_ms, p.jitter_ms)
+        # The pareto tail is unbounded; keep single delays within the documented caps
+        jitter = min(jitter, LIMITS["jitter_ms"][1])
+        return max(0.0, p.latency_ms + jitter) / 1000
+
+    def rto(self) -> float:
+        return max(MIN_RTO, 2 * self.profile.latency_ms / 1000)
+
+    def stall(self, nbytes: int) -> float:
+        """Retransmission stall for sending `nbytes`, or 0 if no packet was lost."""
+        if not self.profile.loss:
+            return 0.0
+        packets = max(1, math.ceil(nbytes / PACKET_BYTES))
+        p_any_lost = 1 - (1 - self.profile.loss) ** packets
+        return self.rto() if self.rng.random() < p_any_lost else 0.0
+
+    def chunk_size(self, bps: float, default: int) -> int:
+        """Chunk size giving ~50 ms pacing steps on capped links."""
+        if not bps:
+            return default
+        return max(1024, min(default, int(bps / 8 / 20)))
+
+
+class Pacer:
+    """Throttles one transfer to `bps` and adds loss stalls, chunk by chunk."""
+
+    def __init__(self, impairment: Impairment, bps: float):
+        self.impairment = impairment
+        self.bps = bps
+        self._ready = time.monotonic()
+
+    async def transferred(self, nbytes: int):
+        """Call after each chunk; sleeps until the link could carry the next one."""
+        self._ready += self.impairment.stall(nbytes) + (nbytes * 8 / self.bps if self.bps else 0.0)
+        wait = self._ready - time.monotonic()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        else:
+            # Idle time is not banked as burst credit
+            self._ready = time.monotonic()
+
+
+_sessions = TTLCache(max_entries=1024)
+
+
+def impairment_for(token: Optional[str]) -> Optional[Impairment]:
+    """Session for a token (created on first use), or None for no token."""
+    if not token:
+        return None
+    session = _sessions.get(token)
+    if session is None:
+        session = Impairment(parse_token(token))
+        _sessions.set(token, session, time.time() + SESSION_TTL)
+    return session
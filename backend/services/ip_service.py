@@ -1,5 +1,11 @@
-import httpx
+import os
 from typing import Dict, Any, Optional
+from services.metrics import geo_lookups
+from services.timing import span
+
+
+# Geolocation provider (ip-api.com JSON API, or a compatible stub for load tests)
+IP_API_URL = os.environ.get("IP_API_URL", "http://ip-api.com/json").rstrip("/")
 
 
 async def get_ip_info(client_ip: str) -> Dict[str, Any]:
@@ -22,20 +28,29 @@ async def get_ip_info(client_ip: str) -> Dict[str, Any]:
     }
     
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            response = await client.get(
-                f"http://ip-api.com/json/{client_ip}",
-                params={
-                    "fields": "status,message,country,countryCode,region,regionName,city,zip,lat,lon,timezone,isp,org,as,proxy,hosting,query"
-                }
-            )
-            
-            if response.status_code == 200:
+        import httpx  # deferred: only needed once a lookup actually happens
+
+        with span("geo"):
+            async with httpx.AsyncClient(timeout=10.0) as client:
+                response = await client.get(
+                    f"{IP_API_URL}/{client_ip}",
+                    params={
+                        "fields": "status,message,country,countryCode,region,regionName,city,zip,lat,lon,timezone,isp,org,as,proxy,hosting,query"
+                    }
+                )
+        
+        if response.status_code == 200:
+            with span("geo.decode"):
                 data = response.json()
-                if data.get("status") == "success":
-                    return data
+            if data.get("status") == "success":
+                geo_lookups.inc("hit")
+                return data
+        
+        # Provider answered but had no data for this IP
+        geo_lookups.inc("miss")
                     
     except Exception as e:
+        geo_lookups.inc("error")
         print(f"IP lookup error: {e}")
     
     return default_data
@@ -0,0 +1,233 @@
+"""
+In-process metrics with Prometheus text exposition.
+
+Counters and histograms are plain Python objects updated without locks:
+increments are racy only across threads, where a rare lost update is an
+acceptable trade for keeping the per-request cost to a few microseconds.
+Each worker process exposes its own values at /metrics.
+"""
+
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+
+# Latency buckets in seconds, from sub-millisecond pings to long transfers
+LATENCY_BUCKETS: Tuple[float, ...] = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_labels(names: Sequence[str], values: LabelValues, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for labels, value in self._values.items():
+            lines.append(f"{self.name}{_format_labels(self.label_names, labels)} {value:g}")
+        return lines
+
+
+class Histogram:
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS
+    ):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts (non-cumulative, +Inf last), sum, count]
+        self._series: Dict[LabelValues, list] = {}
+
+    def observe(self, value: float, *labels: str):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def count(self, *labels: str) -> int:
+        series = self._series.get(labels)
+        return series[2] if series else 0
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total, count) in self._series.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound:g}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, labels, le)} {cumulative}")
+            label_str = _format_labels(self.label_names, labels)
+            lines.append(f"{self.name}_sum{label_str} {total:g}")
+            lines.append(f"{self.name}_count{label_str} {count}")
+        return lines
+
+
+class CallbackMetric:
+    """Values read from a callback at scrape time, for state kept elsewhere."""
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labels: Sequence[str],
+        collect: Callable[[], Dict[LabelValues, float]],
+        type: str = "gauge"
+    ):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self.collect = collect
+        self.type = type
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        for labels, value in self.collect().items():
+            lines.append(f"{self.name}{_format_labels(self.label_names, labels)} {value:g}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+
+    def counter(self, name: str, help: str, labels: Sequence[str] = ()) -> Counter:
+        return self._metrics.setdefault(name, Counter(name, help, labels))
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS
+    ) -> Histogram:
+        return self._metrics.setdefault(name, Histogram(name, help, labels, buckets))
+
+    def callback(
+        self,
+        name: str,
+        help: str,
+        labels: Sequence[str],
+        collect: Callable[[], Dict[LabelValues, float]],
+        type: str = "gauge"
+    ) -> CallbackMetric:
+        return self._metrics.setdefault(name, CallbackMetric(name, help, labels, collect, type))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+# HTTP
+http_requests = registry.counter(
+    "speedtest_http_requests_total", "HTTP requests by route, method and status", ("route", "method", "status")
+)
+http_latency = registry.histogram(
+    "speedtest_http_request_duration_seconds", "HTTP request latency until the response is fully sent", ("route", "method")
+)
+
+# Transfer endpoints
+bytes_served = registry.counter("speedtest_download_bytes_total", "Bytes served by /speedtest/download and WebSocket download phases")
+bytes_received = registry.counter("speedtest_upload_bytes_total", "Bytes received by /speedtest/upload and WebSocket upload phases")
+
+# Dependencies
+geo_lookups = registry.counter(
+    "speedtest_geo_lookups_total", "IP geolocation lookups by outcome (hit, miss, error)", ("outcome",)
+)
+card_render_seconds = registry.histogram(
+    "speedtest_card_render_seconds", "Share card render time by format", ("format",)
+)
+db_op_seconds = registry.histogram(
+    "speedtest_db_op_seconds", "SQLite operation time on the DB threads", ("db", "op")
+)
+
+
+def timed_call(histogram: Histogram, func, *labels: str):
+    """Wrap a zero-argument callable so its run time is observed under `labels`."""
+    def wrapper():
+        start = time.perf_counter()
+        try:
+            return func()
+        finally:
+            histogram.observe(time.perf_counter() - start, *labels)
+    return wrapper
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware recording per-route request counts and latency.
+    Routes are labelled by their path template (unmatched paths share one
+    label) so label cardinality stays bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._route_paths: Optional[Dict[object, str]] = None
+
+    def _route_label(self, scope) -> str:
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "unmatched"
+        if self._route_paths is None:
+            self._route_paths = {
+                getattr(route, "endpoint", None): route.path
+                for route in scope["app"].routes
+                if hasattr(route, "path")
+            }
+        return self._route_paths.get(endpoint, "unmatched")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = "500"
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = self._route_label(scope)
+            method = scope["method"]
+            http_requests.inc(route, method, status)
+            http_latency.observe(time.perf_counter() - start, route, method)
@@ -0,0 +1,139 @@
+"""
+In-process statistical sampling profiler.
+
+A background thread snapshots every thread's Python stack with
+`sys._current_frames()` at a fixed interval and counts identical stacks.
+The output is "collapsed" text, one `frame;frame;frame count` line per
+stack, which flamegraph.pl, speedscope and similar tools read directly.
+
+Because sampling happens on its own thread it keeps working while the
+event loop is blocked by CPU-bound or synchronous code: the interpreter
+hands the GIL to the sampler at least every switch interval (5 ms), and
+C calls such as SQLite queries release it entirely.
+
+The sampler measures its own CPU time and backs off so that it never uses
+more than `max_overhead` of one core, whatever interval was requested.
+"""
+
+import os
+import sys
+import time
+import threading
+from collections import Counter
+from typing import Dict
+
+
+# Leaf functions of threads that are only waiting for work
+IDLE_FRAMES = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"),
+    ("selectors.py", "select"),
+    ("runners.py", "run"),  # event loop idle inside uvloop, which has no Python frames
+    ("thread.py", "_worker"),
+}
+
+_prefixes = sorted({os.path.abspath(p) + os.sep for p in sys.path if p}, key=len, reverse=True)
+
+
+def _short_path(filename: str) -> str:
+    for prefix in _prefixes:
+        if filename.startswith(prefix):
+            return filename[len(prefix):]
+    return filename
+
+
+class ProfileResult:
+    def __init__(self, stacks: Counter, samples: int, duration: float, cpu_seconds: float, interval: float):
+        self.stacks = stacks
+        self.samples = samples
+        self.duration = duration
+        self.cpu_seconds = cpu_seconds
+        self.interval = interval  # mean seconds between samples actually achieved
+
+    @property
+    def overhead(self) -> float:
+        """Sampler CPU time as a fraction of one core over the run."""
+        return self.cpu_seconds / self.duration if self.duration > 0 else 0.0
+
+    def collapsed(self) -> str:
+        lines = [f"{stack} {count}" for stack, count in self.stacks.most_common()]
+        return "\n".join(lines) + "\n" if lines else ""
+
+
+class SamplingProfiler:
+    """One profiling run at a time per process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._labels: Dict[object, str] = {}
+
+    @property
+    def running(self) -> bool:
+        return self._lock.locked()
+
+    def _frame_label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            name = getattr(code, "co_qualname", code.co_name)
+            label = f"{name} ({_short_path(code.co_filename)}:{code.co_firstlineno})".replace(";", ":")
+            self._labels[code] = label
+        return label
+
+    def _sample(self, stacks: Counter, own_ident: int, include_idle: bool):
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == own_ident:
+                continue
+            leaf = frame.f_code
+            if not include_idle and (os.path.basename(leaf.co_filename), leaf.co_name) in IDLE_FRAMES:
+                continue
+            labels = []
+            while frame is not None:
+                labels.append(self._frame_label(frame.f_code))
+                frame = frame.f_back
+            labels.append(names.get(ident, f"thread-{ident}").replace(";", ":"))
+            labels.reverse()
+            stacks[";".join(labels)] += 1
+
+    def run(self, seconds: float, interval: float, max_overhead: float, include_idle: bool = False) -> ProfileResult:
+        """
+        Sample all threads for `seconds`, blocking the calling thread.
+        Raises RuntimeError if a run is already in progress.
+        """
+        if not self._lock.acquire(blocking=False):
+            raise RuntimeError("A profile is already running")
+        try:
+            own_ident = threading.get_ident()
+            stacks: Counter = Counter()
+            samples = 0
+            cpu_start = time.thread_time()
+            start = time.perf_counter()
+            deadline = start + seconds
+            while True:
+                sample_cpu = time.thread_time()
+                self._sample(stacks, own_ident, include_idle)
+                samples += 1
+                sample_cpu = time.thread_time() - sample_cpu
+
+                # Stretch the interval so sampling stays under max_overhead of a core
+                wait = max(interval, sample_cpu / max_overhead - sample_cpu)
+                now = time.perf_counter()
+                if now >= deadline:
+                    break
+                time.sleep(min(wait, deadline - now))
+
+            duration = time.perf_counter() - start
+            return ProfileResult(
+                stacks=stacks,
+                samples=samples,
+                duration=duration,
+                cpu_seconds=time.thread_time() - cpu_start,
+                interval=duration / samples,
+            )
+        finally:
+            self._labels.clear()
+            self._lock.release()
+
+
+profiler = SamplingProfiler()
@@ -0,0 +1,282 @@
+"""
+Append-only store for completed speed test results with hourly and daily
+rollups.
+
+Results are buffered in memory and written in batches. Background tasks
+fold new raw rows into the rollup tables incrementally (by rowid
+watermark) and prune raw rows past their retention. Aggregate queries
+only read the rollup tables.
+"""
+
+import os
+import time
+import sqlite3
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Optional, Dict, Any, Callable, List, Tuple, TypeVar
+from services.share_store import SQLiteDatabase
+from services.metrics import db_op_seconds, timed_call
+
+
+RESULTS_DB_PATH = os.environ.get("RESULTS_DB_PATH", "test_results.db")
+RAW_RETENTION_DAYS = float(os.environ.get("RESULTS_RAW_RETENTION_DAYS", "7"))
+MAX_BUFFERED = 10000
+
+# Rollup granularity name -> (table, bucket width in seconds)
+ROLLUPS: Dict[str, Tuple[str, int]] = {
+    "hourly": ("results_hourly", 3600),
+    "daily": ("results_daily", 86400),
+}
+GROUP_COLUMNS = ("asn", "country", "server_region")
+
+SQL_INSERT_RESULT = (
+    "INSERT INTO results (ts, asn, country, server_region, ping, jitter, download, upload, score) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+SQL_ROLLUP = """
+    INSERT INTO {table} (bucket, asn, country, server_region, count,
+        ping_sum, jitter_sum, download_sum, upload_sum, score_sum,
+        ping_min, download_max, upload_max)
+    SELECT ts - ts % {width}, asn, country, server_region, COUNT(*),
+        SUM(ping), SUM(jitter), SUM(download), SUM(upload), SUM(score),
+        MIN(ping), MAX(download), MAX(upload)
+    FROM results WHERE id > ? AND id <= ?
+    GROUP BY 1, 2, 3, 4
+    ON CONFLICT (bucket, asn, country, server_region) DO UPDATE SET
+        count = count + excluded.count,
+        ping_sum = ping_sum + excluded.ping_sum,
+        jitter_sum = jitter_sum + excluded.jitter_sum,
+        download_sum = download_sum + excluded.download_sum,
+        upload_sum = upload_sum + excluded.upload_sum,
+        score_sum = score_sum + excluded.score_sum,
+        ping_min = MIN(ping_min, excluded.ping_min),
+        download_max = MAX(download_max, excluded.download_max),
+        upload_max = MAX(upload_max, excluded.upload_max)
+"""
+# Strictly below the watermark: the newest rolled-up row is kept, so tables
+# created before ids were AUTOINCREMENT never hand out rowids at or below it
+SQL_PRUNE_RAW = (
+    "DELETE FROM results WHERE id IN "
+    "(SELECT id FROM results WHERE id < ? AND ts < ? LIMIT ?)"
+)
+
+T = TypeVar("T")
+
+
+class ResultsStore:
+    def __init__(self, db_path: str = RESULTS_DB_PATH):
+        self.db = SQLiteDatabase(db_path)
+        # Single writer thread: ingestion and rollups never contend with each other
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._buffer: List[tuple] = []
+        self.dropped = 0
+        self._init_db()
+
+    def _init_db(self):
+        conn = self.db.conn()
+        with conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS results (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    ts INTEGER NOT NULL,
+                    asn TEXT NOT NULL,
+                    country TEXT NOT NULL,
+                    server_region TEXT NOT NULL,
+                    ping REAL NOT NULL,
+                    jitter REAL NOT NULL,
+                    download REAL NOT NULL,
+                    upload REAL NOT NULL,
+                    score INTEGER NOT NULL
+                )
+            """)
+            for table, _ in ROLLUPS.values():
+                conn.execute(f"""
+                    CREATE TABLE IF NOT EXISTS {table} (
+                        bucket INTEGER NOT NULL,
+                        asn TEXT NOT NULL,
+                        country TEXT NOT NULL,
+                        server_region TEXT NOT NULL,
+                        count INTEGER NOT NULL,
+                        ping_sum REAL NOT NULL,
+                        jitter_sum REAL NOT NULL,
+                        download_sum REAL NOT NULL,
+                        upload_sum REAL NOT NULL,
+                        score_sum REAL NOT NULL,
+                        ping_min REAL NOT NULL,
+                        download_max REAL NOT NULL,
+                        upload_max REAL NOT NULL,
+                        PRIMARY KEY (bucket, asn, country, server_region)
+                    ) WITHOUT ROWID
+                """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS rollup_state (
+                    name TEXT PRIMARY KEY,
+                    last_id INTEGER NOT NULL
+                )
+            """)
+
+    async def run(self, func: Callable[..., T], *args, **kwargs) -> T:
+        """Run a blocking ResultsStore method on its writer thread."""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="results-db")
+        loop = asyncio.get_running_loop()
+        call = timed_call(db_op_seconds, partial(func, *args, **kwargs), "results", func.__name__)
+        return await loop.run_in_executor(self._executor, call)
+
+    def record(
+        self,
+        asn: str,
+        country: str,
+        server_region: str,
+        ping: float,
+        jitter: float,
+        download_mbps: float,
+        upload_mbps: float,
+        score: int,
+        ts: Optional[int] = None
+    ):
+        """
+        Buffer one completed test result. Never blocks; results are written
+        by the next flush, and dropped (and counted) if the buffer is full.
+        """
+        if len(self._buffer) >= MAX_BUFFERED:
+            self.dropped += 1
+            return
+        self._buffer.append((
+            int(ts if ts is not None else time.time()),
+            asn, country, server_region,
+            ping, jitter, download_mbps, upload_mbps, score,
+        ))
+
+    def take_buffer(self) -> List[tuple]:
+        batch, self._buffer = self._buffer, []
+        return batch
+
+    def insert_results(self, rows: List[tuple]):
+        """
+        Append a batch of result rows in one transaction. If the batch is
+        rejected, rows are retried one by one so a single bad row only
+        loses itself; those are logged and counted in `dropped`.
+        """
+        if not rows:
+            return
+        conn = self.db.conn()
+        try:
+            with conn:
+                conn.executemany(SQL_INSERT_RESULT, rows)
+            return
+        except sqlite3.Error as e:
+            print(f"Results batch insert failed ({e}), retrying row by row")
+        for row in rows:
+            try:
+                with conn:
+                    conn.execute(SQL_INSERT_RESULT, row)
+            except sqlite3.Error as e:
+                self.dropped += 1
+                print(f"Dropped invalid result row {row!r}: {e}")
+
+    def rollup(self) -> int:
+        """
+        Fold raw rows added since the last rollup into every rollup table,
+        then prune raw rows older than the retention window. Returns the
+        number of raw rows rolled up.
+        """
+        conn = self.db.conn()
+        max_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM results").fetchone()[0]
+        rolled = 0
+
+        with conn:
+            for name, (table, width) in ROLLUPS.items():
+                row = conn.execute("SELECT last_id FROM rollup_state WHERE name = ?", (name,)).fetchone()
+                last_id = row[0] if row else 0
+                if max_id <= last_id:
+                    continue
+                conn.execute(SQL_ROLLUP.format(table=table, width=width), (last_id, max_id))
+                conn.execute(
+                    "INSERT INTO rollup_state (name, last_id) VALUES (?, ?) "
+                    "ON CONFLICT (name) DO UPDATE SET last_id = excluded.last_id",
+                    (name, max_id),
+                )
+                rolled = max(rolled, max_id - last_id)
+
+        # Only rows already folded into every rollup may be pruned
+        cutoff = int(time.time() - RAW_RETENTION_DAYS * 86400)
+        while True:
+            with conn:
+                deleted = conn.execute(SQL_PRUNE_RAW, (max_id, cutoff, 1000)).rowcount
+            if deleted < 1000:
+                break
+        return rolled
+
+    def query_aggregates(
+        self,
+        granularity: str,
+        since: int,
+        until: int,
+        filters: Dict[str, str],
+        group_by: List[str]
+    ) -> List[Dict[str, Any]]:
+        """
+        Aggregate rollup rows per bucket between `since` and `until` (epoch
+        seconds), filtered by exact matches on GROUP_COLUMNS and grouped by
+        the bucket plus any of GROUP_COLUMNS in `group_by`.
+        """
+        table, _ = ROLLUPS[granularity]
+        keys = [column for column in GROUP_COLUMNS if column in group_by]
+        where = ["bucket >= ?", "bucket < ?"]
+        params: List[Any] = [since, until]
+        for column in GROUP_COLUMNS:
+            if filters.get(column):
+                where.append(f"{column} = ?")
+                params.append(filters[column])
+
+        select_keys = "".join(f", {column}" for column in keys)
+        sql = f"""
+            SELECT bucket{select_keys}, SUM(count) AS count,
+                SUM(ping_sum) / SUM(count) AS ping_avg,
+                SUM(jitter_sum) / SUM(count) AS jitter_avg,
+                SUM(download_sum) / SUM(count) AS download_avg,
+                SUM(upload_sum) / SUM(count) AS upload_avg,
+                SUM(score_sum) / SUM(count) AS score_avg,
+                MIN(ping_min) AS ping_min,
+                MAX(download_max) AS download_max,
+                MAX(upload_max) AS upload_max
+            FROM {table}
+            WHERE {" AND ".join(where)}
+            GROUP BY bucket{select_keys}
+            ORDER BY bucket{select_keys}
+        """
+        return [dict(row) for row in self.db.conn().execute(sql, params).fetchall()]
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        self.db.close()
+
+
+async def flush_results(store: ResultsStore, interval: float):
+    """Background task that writes buffered results in batches."""
+    try:
+        while True:
+            await asyncio.sleep(interval)
+            batch = store.take_buffer()
+            if batch:
+                try:
+                    await store.run(store.insert_results, batch)
+                except Exception as e:
+                    print(f"Results flush error: {e}")
+    finally:
+        # Persist whatever is still buffered on shutdown
+        store.insert_results(store.take_buffer())
+
+
+async def rollup_results(store: ResultsStore, interval: float):
+    """Background task that refreshes the hourly and daily rollups."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await store.run(store.rollup)
+        except Exception as e:
+            print(f"Results rollup error: {e}")
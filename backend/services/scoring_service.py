@@ -1,7 +1,9 @@
 from typing import List, Dict
 from models import Recommendation
+from services.timing import traced
 
 
+@traced("scoring")
 def calculate_network_quality(
     ping: float,
     jitter: float,
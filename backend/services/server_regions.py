@@ -1,8 +1,18 @@
-from typing import List, Dict
-from models import ServerInfo, ServerRegion
+import os
+import json
+import hashlib
+from functools import lru_cache
+from typing import List, Dict, Mapping, Optional, Tuple
+from models import ServerInfo, ServerRegion, ServerRegionsResponse, NearestServer
+from services.server_registry import ServerRegistry, AUTO_SERVER_ID
 
 
-# Server region definitions
+# Optional JSON file with the same shape as SERVER_REGIONS; servers with a
+# non-empty "endpoint" are remote and get health-probed.
+SERVER_REGISTRY_PATH = os.environ.get("SERVER_REGISTRY_PATH", "")
+
+
+# Built-in server region definitions, used when SERVER_REGISTRY_PATH is unset
 # Note: All endpoints point to the same backend for now
 # In production, you would deploy to multiple regions
 SERVER_REGIONS: List[Dict] = [
@@ -28,28 +38,36 @@ SERVER_REGIONS: List[Dict] = [
                 "name": "Singapore",
                 "region": "asia",
                 "flag": "🇸🇬",
-                "endpoint": ""
+                "endpoint": "",
+                "latitude": 1.3521,
+                "longitude": 103.8198
             },
             {
                 "id": "asia-tokyo",
                 "name": "Tokyo, Japan",
                 "region": "asia",
                 "flag": "🇯🇵",
-                "endpoint": ""
+                "endpoint": "",
+                "latitude": 35.6762,
+                "longitude": 139.6503
             },
             {
                 "id": "asia-mumbai",
                 "name": "Mumbai, India",
                 "region": "asia",
                 "flag": "🇮🇳",
-                "endpoint": ""
+                "endpoint": "",
+                "latitude": 19.076,
+                "longitude": 72.8777
             },
             {
                 "id": "asia-sydney",
                 "name": "Sydney, Australia",
                 "region": "asia",
                 "flag": "🇦🇺",
-                "endpoint": ""
+                "endpoint": "",
+                "latitude": -33.8688,
+                "longitude": 151.2093
             }
         ]
     },
@@ -62,28 +80,36 @@ SERVER_REGIONS: List[Dict] = [
                 "name": "London, UK",
                 "region": "europe",
                 "flag": "🇬🇧",
-                "endpoint": ""
+                "endpoint": "",
+                "latitude": 51.5074,
+                "longitude": -0.1278
             },
             {
                 "id": "eu-frankfurt",
                 "name": "Frankfurt, Germany",
                 "region": "europe",
                 "flag": "🇩🇪",
-                "endpoint": ""
+                "endpoint": "",
+                "latitude": 50.1109,
+                "longitude": 8.6821
             },
             {
                 "id": "eu-amsterdam",
                 "name": "Amsterdam, Netherlands",
                 "region": "europe",
                 "flag": "🇳🇱",
-                "endpoint": ""
+                "endpoint": "",
+                "latitude": 52.3676,
+                "longitude": 4.9041
             },
             {
                 "id": "eu-paris",
                 "name": "Paris, France",
                 "region": "europe",
                 "flag": "🇫🇷",
-                "endpoint": ""
+                "endpoint": "",
+                "latitude": 48.8566,
+                "longitude": 2.3522
             }
         ]
     },
@@ -96,28 +122,36 @@ SERVER_REGIONS: List[Dict] = [
                 "name": "New York, USA",
                 "region": "north-america",
                 "flag": "🇺🇸",
-                "endpoint": ""
+                "endpoint": "",
+                "latitude": 40.7128,
+                "longitude": -74.006
             },
             {
                 "id": "us-west",
                 "name": "Los Angeles, USA",
                 "region": "north-america",
                 "flag": "🇺🇸",
-                "endpoint": ""
+                "endpoint": "",
+                "latitude": 34.0522,
+                "longitude": -118.2437
             },
             {
                 "id": "us-central",
                 "name": "Dallas, USA",
                 "region": "north-america",
                 "flag": "🇺🇸",
-                "endpoint": ""
+                "endpoint": "",
+                "latitude": 32.7767,
+                "longitude": -96.797
             },
             {
                 "id": "ca-toronto",
                 "name": "Toronto, Canada",
                 "region": "north-america",
                 "flag": "🇨🇦",
-                "endpoint": ""
+                "endpoint": "",
+                "latitude": 43.6532,
+                "longitude": -79.3832
             }
         ]
     },
@@ -130,7 +164,9 @@ SERVER_REGIONS: List[Dict] = [
                 "name": "São Paulo, Brazil",
                 "region": "south-america",
                 "flag": "🇧🇷",
-                "endpoint": ""
+                "endpoint": "",
+                "latitude": -23.5505,
+                "longitude": -46.6333
             }
         ]
     },
@@ -143,57 +179,108 @@ SERVER_REGIONS: List[Dict] = [
                 "name": "Dubai, UAE",
                 "region": "middle-east",
                 "flag": "🇦🇪",
-                "endpoint": ""
+                "endpoint": "",
+                "latitude": 25.2048,
+                "longitude": 55.2708
             }
         ]
     }
 ]
 
 
+def load_regions(path: str = SERVER_REGISTRY_PATH) -> List[Dict]:
+    """Load the server catalog from the registry file, or the built-in regions"""
+    if not path:
+        return SERVER_REGIONS
+    with open(path) as f:
+        return json.load(f)["regions"]
+
+
+# Catalog parsed once at import into a read-only registry indexed by id
+registry = ServerRegistry(load_regions())
+
+# How long clients may reuse /server-regions before revalidating; kept
+# short because it carries live server status
+REGIONS_MAX_AGE = 15
+
+
+def _server_info(server_data: Mapping, base_url: str) -> ServerInfo:
+    if server_data["id"] == AUTO_SERVER_ID:
+        # Auto points at the best healthy server
+        candidates = registry.auto_candidates()
+        endpoint = registry.endpoint_of(candidates[0], base_url) if candidates else base_url
+        health = None
+    else:
+        endpoint = registry.endpoint_of(server_data, base_url)
+        health = registry.health_of(server_data["id"])
+
+    return ServerInfo(
+        id=server_data["id"],
+        name=server_data["name"],
+        region=server_data["region"],
+        flag=server_data["flag"],
+        endpoint=endpoint,
+        status=health.status if health else "healthy",
+        rtt_ms=round(health.rtt_ms, 1) if health and health.rtt_ms is not None else None,
+        load=round(health.load, 2) if health else None,
+        latitude=server_data.get("latitude"),
+        longitude=server_data.get("longitude")
+    )
+
+
 def get_all_regions(base_url: str) -> List[ServerRegion]:
-    """Get all server regions with endpoints set"""
-    regions = []
-    
-    for region_data in SERVER_REGIONS:
-        servers = []
-        for server_data in region_data["servers"]:
-            server = ServerInfo(
-                id=server_data["id"],
-                name=server_data["name"],
-                region=server_data["region"],
-                flag=server_data["flag"],
-                endpoint=base_url  # All use same endpoint for now
-            )
-            servers.append(server)
-        
-        region = ServerRegion(
+    """Get all server regions with endpoints and live status set"""
+    return [
+        ServerRegion(
             id=region_data["id"],
             name=region_data["name"],
-            servers=servers
+            servers=[_server_info(server_data, base_url) for server_data in region_data["servers"]]
         )
-        regions.append(region)
-    
-    return regions
+        for region_data in registry.regions
+    ]
+
+
+@lru_cache(maxsize=16)
+def _regions_payload(base_url: str, version: int) -> Tuple[bytes, str]:
+    body = ServerRegionsResponse(regions=get_all_regions(base_url)).model_dump_json().encode("utf-8")
+    etag = '"%s"' % hashlib.sha1(body).hexdigest()[:16]
+    return body, etag
+
+
+def get_regions_payload(base_url: str) -> Tuple[bytes, str]:
+    """
+    Serialized /server-regions response and its ETag, rebuilt only when
+    the registry's health state changes (bounded per base_url, since
+    base_url comes from the request Host).
+    """
+    return _regions_payload(base_url, registry.version)
+
+
+def get_nearest_servers(
+    latitude: Optional[float],
+    longitude: Optional[float],
+    base_url: str,
+    k: int = 3
+) -> List[NearestServer]:
+    """
+    Top-k healthy servers nearest to the client. Without a location, the
+    best auto-selection candidates are returned instead.
+    """
+    if latitude is None or longitude is None:
+        ranked = [(server, None) for server in registry.auto_candidates()[:k]]
+    else:
+        ranked = registry.nearest(latitude, longitude, k)
+
+    return [
+        NearestServer(
+            **_server_info(server_data, base_url).model_dump(),
+            distance_km=round(distance, 1) if distance is not None else None
+        )
+        for server_data, distance in ranked
+    ]
 
 
 def get_server_by_id(server_id: str, base_url: str) -> ServerInfo:
-    """Get a specific server by ID"""
-    for region_data in SERVER_REGIONS:
-        for server_data in region_data["servers"]:
-            if server_data["id"] == server_id:
-                return ServerInfo(
-                    id=server_data["id"],
-                    name=server_data["name"],
-                    region=server_data["region"],
-                    flag=server_data["flag"],
-                    endpoint=base_url
-                )
-    
-    # Return default if not found
-    return ServerInfo(
-        id="auto-best",
-        name="Automatic Selection",
-        region="auto",
-        flag="🌐",
-        endpoint=base_url
-    )
+    """Get a specific server by ID, falling back to automatic selection"""
+    server_data = registry.servers_by_id.get(server_id) or registry.servers_by_id[AUTO_SERVER_ID]
+    return _server_info(server_data, base_url)
@@ -0,0 +1,213 @@
+"""
+Registry of speed test servers with live health tracking.
+
+A background prober hits every remote server's /health endpoint and keeps
+an EWMA-smoothed RTT and load factor per server. Servers with an empty
+endpoint are served by this process itself and are always healthy.
+"""
+
+import time
+import asyncio
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Optional, Dict, Any, List, Mapping, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import httpx
+
+
+EWMA_ALPHA = 0.3  # weight of the newest sample
+FAILURE_THRESHOLD = 2  # consecutive failed probes before a server is unhealthy
+AUTO_SERVER_ID = "auto-best"
+EARTH_RADIUS_KM = 6371.0
+
+
+@dataclass
+class ServerHealth:
+    status: str = "unknown"  # "healthy", "unhealthy" or "unknown" (not probed yet)
+    rtt_ms: Optional[float] = None
+    min_rtt_ms: Optional[float] = None
+    load: float = 0.0
+    consecutive_failures: int = 0
+    last_checked: float = 0.0
+
+
+def _ewma(previous: Optional[float], sample: float) -> float:
+    if previous is None:
+        return sample
+    return EWMA_ALPHA * sample + (1 - EWMA_ALPHA) * previous
+
+
+class ServerRegistry:
+    """Read-only server catalog plus mutable health state per remote server."""
+
+    def __init__(self, regions: List[Dict[str, Any]]):
+        self.regions: Tuple[Mapping[str, Any], ...] = tuple(
+            MappingProxyType({
+                "id": region["id"],
+                "name": region["name"],
+                "servers": tuple(MappingProxyType(dict(server)) for server in region["servers"]),
+            })
+            for region in regions
+        )
+        self.servers_by_id: Mapping[str, Mapping[str, Any]] = MappingProxyType({
+            server["id"]: server
+            for region in self.regions
+            for server in region["servers"]
+        })
+        self.health: Dict[str, ServerHealth] = {
+            server_id: ServerHealth()
+            for server_id, server in self.servers_by_id.items()
+            if self.is_remote(server)
+        }
+        # Bumped whenever the visible health state changes, so cached
+        # responses built from the registry know when to rebuild.
+        self.version = 0
+
+        # Every located server, for nearest() queries
+        self._geo_servers: Tuple[Mapping[str, Any], ...] = tuple(
+            server for server in self.servers_by_id.values()
+            if server.get("latitude") is not None and server.get("longitude") is not None
+        )
+        # (lat, lon, cos(lat)) arrays in radians, built on the first nearest() call
+        self._geo_arrays: Optional[Tuple[Any, Any, Any]] = None
+
+    @staticmethod
+    def is_remote(server: Mapping[str, Any]) -> bool:
+        return bool(server.get("endpoint")) and server["id"] != AUTO_SERVER_ID
+
+    def endpoint_of(self, server: Mapping[str, Any], base_url: str) -> str:
+        return server.get("endpoint") or base_url
+
+    def health_of(self, server_id: str) -> ServerHealth:
+        """Health of a server; local servers are always healthy."""
+        return self.health.get(server_id) or ServerHealth(status="healthy", rtt_ms=0.0, min_rtt_ms=0.0)
+
+    def record_success(self, server_id: str, rtt_ms: float, load: Optional[float] = None):
+        health = self.health[server_id]
+        old = (health.status, _rounded(health))
+
+        health.rtt_ms = _ewma(health.rtt_ms, rtt_ms)
+        health.min_rtt_ms = rtt_ms if health.min_rtt_ms is None else min(health.min_rtt_ms, rtt_ms)
+        if load is None:
+            # No load reported: estimate it from how far RTT is inflated over its floor
+            load = max(0.0, 1.0 - health.min_rtt_ms / health.rtt_ms) if health.rtt_ms else 0.0
+        health.load = _ewma(health.load, min(1.0, max(0.0, load)))
+        health.consecutive_failures = 0
+        health.status = "healthy"
+        health.last_checked = time.time()
+
+        if (health.status, _rounded(health)) != old:
+            self.version += 1
+
+    def record_failure(self, server_id: str):
+        health = self.health[server_id]
+        health.consecutive_failures += 1
+        health.last_checked = time.time()
+        if health.consecutive_failures >= FAILURE_THRESHOLD and health.status != "unhealthy":
+            health.status = "unhealthy"
+            self.version += 1
+
+    def auto_candidates(self) -> List[Mapping[str, Any]]:
+        """
+        Servers eligible for automatic selection, best first: unhealthy
+        servers are dropped and the rest ranked by RTT weighted by load.
+        """
+        candidates = []
+        for server_id, server in self.servers_by_id.items():
+            if server_id == AUTO_SERVER_ID:
+                continue
+            health = self.health_of(server_id)
+            if health.status == "unhealthy":
+                continue
+            rtt = health.rtt_ms if health.rtt_ms is not None else float("inf")
+            candidates.append((rtt * (1 + health.load), server))
+        candidates.sort(key=lambda item: item[0])
+        return [server for _, server in candidates]
+
+    def nearest(self, latitude: float, longitude: float, k: int = 3) -> List[Tuple[Mapping[str, Any], float]]:
+        """
+        The k healthy servers closest to a point, as (server, distance_km)
+        pairs nearest first. Distances are a vectorized haversine over
+        coordinate arrays computed once on first use.
+        """
+        if not self._geo_servers:
+            return []
+        # numpy is only needed here, so it is not loaded at startup
+        import numpy as np
+
+        if self._geo_arrays is None:
+            geo_lat = np.radians(np.array([s["latitude"] for s in self._geo_servers], dtype=np.float64))
+            geo_lon = np.radians(np.array([s["longitude"] for s in self._geo_servers], dtype=np.float64))
+            self._geo_arrays = (geo_lat, geo_lon, np.cos(geo_lat))
+        geo_lat, geo_lon, geo_cos_lat = self._geo_arrays
+
+        lat, lon = np.radians(latitude), np.radians(longitude)
+        a = (
+            np.sin((geo_lat - lat) / 2) ** 2
+            + np.cos(lat) * geo_cos_lat * np.sin((geo_lon - lon) / 2) ** 2
+        )
+        distances = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+        result = []
+        for index in np.argsort(distances):
+            server = self._geo_servers[index]
+            if self.health_of(server["id"]).status == "unhealthy":
+                continue
+            result.append((server, float(distances[index])))
+            if len(result) >= k:
+                break
+        return result
+
+
+def _rounded(health: ServerHealth) -> Tuple:
+    """Coarse view of a health record; changes below this precision are not published."""
+    return (
+        round(health.rtt_ms) if health.rtt_ms is not None else None,
+        round(health.load, 1),
+    )
+
+
+async def probe_server(client: "httpx.AsyncClient", registry: ServerRegistry, server: Mapping[str, Any]):
+    """Probe one server's /health endpoint and record the outcome."""
+    import httpx
+
+    url = server["endpoint"].rstrip("/") + "/health"
+    start = time.perf_counter()
+    try:
+        response = await client.get(url)
+        rtt_ms = (time.perf_counter() - start) * 1000
+        if response.status_code != 200:
+            registry.record_failure(server["id"])
+            return
+        load = None
+        try:
+            body = response.json()
+        except ValueError:
+            body = None
+        if isinstance(body, dict):
+            reported = body.get("load")
+            if isinstance(reported, (int, float)):
+                load = float(reported)
+        registry.record_success(server["id"], rtt_ms, load)
+    except httpx.HTTPError:
+        registry.record_failure(server["id"])
+
+
+async def probe_servers(
+    registry: ServerRegistry,
+    interval: float,
+    timeout: float,
+    transport: Optional["httpx.AsyncBaseTransport"] = None
+):
+    """Background task that probes every remote server each `interval` seconds."""
+    import httpx
+
+    remote = [server for server in registry.servers_by_id.values() if registry.is_remote(server)]
+    async with httpx.AsyncClient(timeout=timeout, transport=transport) as client:
+        while True:
+            try:
+                await asyncio.gather(*(probe_server(client, registry, server) for server in remote))
+            except Exception as e:
+                print(f"Server probe error: {e}")
+            await asyncio.sleep(interval)
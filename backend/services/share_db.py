@@ -1,88 +1,196 @@
 """
-SQLite-based storage for shared reports with 7-day expiration.
+Storage for shared reports with 7-day expiration.
+
+ShareDB fronts a pluggable ShareStore (see services/share_store.py). It
+runs every blocking store call on a dedicated thread pool so disk I/O
+never blocks the event loop. It also holds the per-report caches and the
+group-commit insert queue.
 """
 
-import sqlite3
 import os
-from datetime import datetime
-from typing import Optional, Dict, Any
+import sys
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Optional, Dict, Any, Callable, List, Tuple, TypeVar
+from services.share_store import ShareStore, SQLiteShareStore, create_store
+from services.ttl_cache import TTLCache
+from services.metrics import db_op_seconds, timed_call
+from services.timing import span
+
 
+DB_WORKERS = int(os.environ.get("SHARE_DB_WORKERS", "4"))
+CACHE_SIZE = int(os.environ.get("SHARE_CACHE_SIZE", "1024"))
+CACHE_TTL = float(os.environ.get("SHARE_CACHE_TTL", "300"))
+# Group commit: inserts arriving within this window share one transaction
+COMMIT_WINDOW_MS = float(os.environ.get("SHARE_DB_COMMIT_WINDOW_MS", "2"))
+COMMIT_MAX_BATCH = int(os.environ.get("SHARE_DB_COMMIT_MAX_BATCH", "256"))
 
-DB_PATH = os.environ.get("SHARE_DB_PATH", "shared_reports.db")
+T = TypeVar("T")
 
 
 class ShareDB:
-    def __init__(self, db_path: str = DB_PATH):
-        self.db_path = db_path
-        self._init_db()
-
-    def _get_conn(self) -> sqlite3.Connection:
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        return conn
-
-    def _init_db(self):
-        """Create the shared_reports table if it doesn't exist."""
-        conn = self._get_conn()
+    def __init__(
+        self,
+        store: Optional[ShareStore] = None,
+        workers: int = DB_WORKERS,
+        cache_size: int = CACHE_SIZE
+    ):
+        self.store = store if store is not None else create_store()
+        # Per-report derived data (serialized responses, rendered cards) keyed
+        # by share_id; entries never outlive the report and are dropped on delete.
+        self.response_cache = TTLCache(max_entries=cache_size)
+        self.card_cache = TTLCache(max_entries=max(1, cache_size // 4))
+        self.workers = workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # Write-behind queue of (row, future) pairs awaiting a group commit
+        self.commit_window = COMMIT_WINDOW_MS / 1000
+        self.commit_max_batch = COMMIT_MAX_BATCH
+        self._pending: List[Tuple[tuple, asyncio.Future]] = []
+        self._flusher: Optional[asyncio.Task] = None
+
+    async def run(self, func: Callable[..., T], *args, **kwargs) -> T:
+        """
+        Run a blocking ShareDB method on the dedicated DB thread pool, in a
+        copy of the caller's context so request spans recorded there count.
+        """
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.workers, thread_name_prefix="share-db"
+            )
+        loop = asyncio.get_running_loop()
+        call = timed_call(db_op_seconds, partial(func, *args, **kwargs), "share", func.__name__)
+        with span(f"db.{func.__name__}"):
+            return await loop.run_in_executor(self._executor, contextvars.copy_context().run, call)
+
+    def new_share_id(self) -> str:
+        """Generate a share_id; sharded stores encode the shard in it."""
+        return self.store.new_share_id()
+
+    async def queue_insert(self, share_id: str, report_data: str, created_at: str, expires_at: str):
+        """
+        Insert a report through the group-commit queue. Inserts arriving
+        within `commit_window` are written in one transaction per shard;
+        this returns only after that transaction has committed, and raises
+        if the row itself failed to insert.
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append(((share_id, report_data, created_at, expires_at), future))
+        if self._flusher is None or self._flusher.done():
+            # Fresh context: the flusher serves many requests, not the one that started it
+            self._flusher = asyncio.create_task(self._flush_pending(), context=contextvars.Context())
+        with span("db.queue_insert"):
+            await future
+
+    async def _flush_pending(self):
+        """Commit queued inserts in batches until the queue is empty."""
+        await asyncio.sleep(self.commit_window)
+        while self._pending:
+            batch = self._pending[:self.commit_max_batch]
+            del self._pending[:self.commit_max_batch]
+
+            # Shards commit independently, so their transactions run in parallel
+            groups: Dict[int, List[Tuple[tuple, asyncio.Future]]] = {}
+            for item in batch:
+                groups.setdefault(self.store.shard_of(item[0][0]), []).append(item)
+            await asyncio.gather(*(self._commit_group(group) for group in groups.values()))
+
+    async def _commit_group(self, group: List[Tuple[tuple, asyncio.Future]]):
         try:
-            conn.execute("""
-                CREATE TABLE IF NOT EXISTS shared_reports (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    share_id TEXT UNIQUE NOT NULL,
-                    report_data TEXT NOT NULL,
-                    created_at TEXT NOT NULL,
-                    expires_at TEXT NOT NULL
-                )
-            """)
-            conn.execute("""
-                CREATE INDEX IF NOT EXISTS idx_share_id ON shared_reports (share_id)
-            """)
-            conn.execute("""
-                CREATE INDEX IF NOT EXISTS idx_expires_at ON shared_reports (expires_at)
-            """)
-            conn.commit()
-        finally:
-            conn.close()
+            errors = await self.run(self.store.insert_many, [row for row, _ in group])
+        except Exception as e:
+            errors = [e] * len(group)
+
+        for (_, future), error in zip(group, errors):
+            if future.done():
+                continue
+            if error is None:
+                future.set_result(None)
+            else:
+                future.set_exception(error)
+
+    async def drain(self):
+        """Wait for queued inserts to be committed."""
+        if self._flusher is not None:
+            await self._flusher
+
+    def close(self):
+        """
+        Stop the DB thread pool and release the store's connections.
+        Both are reopened lazily if the instance is used again.
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        self.store.close()
 
     def insert_report(self, share_id: str, report_data: str, created_at: str, expires_at: str):
-        """Insert a new shared report."""
-        conn = self._get_conn()
-        try:
-            conn.execute(
-                "INSERT INTO shared_reports (share_id, report_data, created_at, expires_at) VALUES (?, ?, ?, ?)",
-                (share_id, report_data, created_at, expires_at),
-            )
-            conn.commit()
-        finally:
-            conn.close()
+        """Insert a new shared report. report_data is JSON text, stored compressed."""
+        error = self.store.insert_many([(share_id, report_data, created_at, expires_at)])[0]
+        if error is not None:
+            raise error
+
+    def insert_many(self, rows: List[tuple]) -> List[Optional[Exception]]:
+        """
+        Insert several (share_id, report_data, created_at, expires_at) rows,
+        one transaction per shard. Returns one error (or None) per row.
+        """
+        return self.store.insert_many(rows)
 
     def get_report(self, share_id: str) -> Optional[Dict[str, Any]]:
-        """Retrieve a report by share_id."""
-        conn = self._get_conn()
-        try:
-            row = conn.execute(
-                "SELECT share_id, report_data, created_at, expires_at FROM shared_reports WHERE share_id = ?",
-                (share_id,),
-            ).fetchone()
-            return dict(row) if row else None
-        finally:
-            conn.close()
+        """Retrieve an unexpired report by share_id. Read-only."""
+        return self.store.get_report(share_id)
 
     def delete_report(self, share_id: str):
         """Delete a specific report."""
-        conn = self._get_conn()
-        try:
-            conn.execute("DELETE FROM shared_reports WHERE share_id = ?", (share_id,))
-            conn.commit()
-        finally:
-            conn.close()
-
-    def cleanup_expired(self):
-        """Remove all expired reports."""
-        conn = self._get_conn()
+        self.store.delete_report(share_id)
+        self.response_cache.pop(share_id)
+        self.card_cache.pop(share_id)
+
+    def delete_expired(self, limit: int = 500) -> int:
+        """Remove up to `limit` expired reports. Returns the number deleted."""
+        return self.store.delete_expired(limit)
+
+    def migrate_payloads(self, batch_size: int = 500) -> int:
+        """
+        Rewrite one batch of legacy TEXT payloads as compressed BLOBs.
+        Returns the number of rows converted; 0 means migration is complete.
+        """
+        return self.store.migrate_payloads(batch_size)
+
+
+async def sweep_expired(db: ShareDB, interval: float, batch_size: int):
+    """
+    Background task that periodically deletes expired reports in bounded
+    batches, so each write transaction stays short and inserts can
+    interleave between batches.
+    """
+    while True:
         try:
-            now = datetime.utcnow().isoformat()
-            conn.execute("DELETE FROM shared_reports WHERE expires_at < ?", (now,))
-            conn.commit()
-        finally:
-            conn.close()
+            while await db.run(db.delete_expired, batch_size) >= batch_size:
+                await asyncio.sleep(0)
+        except Exception as e:
+            print(f"Share expiry sweep error: {e}")
+        await asyncio.sleep(interval)
+
+
+if __name__ == "__main__":
+    # Convert an existing database to compressed payloads:
+    #   python -m services.share_db migrate [db_path]
+    # Without db_path, the store configured by SHARE_DB_* is migrated.
+    if len(sys.argv) < 2 or sys.argv[1] != "migrate":
+        sys.exit("usage: python -m services.share_db migrate [db_path]")
+
+    store = SQLiteShareStore(sys.argv[2]) if len(sys.argv) > 2 else create_store()
+    db = ShareDB(store)
+    total = 0
+    while True:
+        converted = db.migrate_payloads()
+        if not converted:
+            break
+        total += converted
+        print(f"Migrated {total} reports...")
+    store.vacuum()
+    db.close()
+    print(f"Done: {total} reports compressed")
@@ -0,0 +1,393 @@
+"""
+Storage backends for shared reports.
+
+ShareDB talks to a ShareStore; the backend is chosen from the environment:
+
+- SQLiteShareStore: a single SQLite file (the default)
+- ShardedSQLiteShareStore: N SQLite files, routed by the share_id prefix
+- MemoryShareStore: process-local dict, for tests and benchmarks
+
+All methods are blocking and are run on ShareDB's thread pool.
+"""
+
+import sqlite3
+import os
+import zlib
+import random
+import threading
+import uuid
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Optional, Dict, Any, List
+from services.timing import span
+
+try:
+    import zstandard
+except ImportError:  # optional, zlib is used when unavailable
+    zstandard = None
+
+
+DB_PATH = os.environ.get("SHARE_DB_PATH", "shared_reports.db")
+DB_BACKEND = os.environ.get("SHARE_DB_BACKEND", "sqlite")
+DB_SHARDS = int(os.environ.get("SHARE_DB_SHARDS", "1"))
+
+# Statements are kept as constants so sqlite3's per-connection statement
+# cache reuses the prepared form on every call.
+SQL_INSERT = "INSERT INTO shared_reports (share_id, report_data, created_at, expires_at) VALUES (?, ?, ?, ?)"
+SQL_SELECT = (
+    "SELECT share_id, report_data, created_at, expires_at FROM shared_reports "
+    "WHERE share_id = ? AND expires_at > ?"
+)
+SQL_DELETE = "DELETE FROM shared_reports WHERE share_id = ?"
+SQL_DELETE_EXPIRED = (
+    "DELETE FROM shared_reports WHERE id IN "
+    "(SELECT id FROM shared_reports WHERE expires_at < ? LIMIT ?)"
+)
+
+SQL_SELECT_TEXT_PAYLOADS = "SELECT id, report_data FROM shared_reports WHERE typeof(report_data) = 'text' LIMIT ?"
+SQL_UPDATE_PAYLOAD = "UPDATE shared_reports SET report_data = ? WHERE id = ?"
+
+# report_data is stored as a BLOB whose first byte is the payload format.
+# Rows written before compression hold plain JSON TEXT and are read as-is.
+PAYLOAD_RAW = 0
+PAYLOAD_ZLIB = 1
+PAYLOAD_ZSTD = 2
+PAYLOAD_FORMAT = PAYLOAD_ZSTD if zstandard is not None else PAYLOAD_ZLIB
+# Payloads smaller than this are not worth compressing
+COMPRESS_MIN_BYTES = 256
+
+
+def encode_payload(report_data: str, payload_format: int = PAYLOAD_FORMAT) -> bytes:
+    """Encode report JSON into a versioned, compressed BLOB."""
+    raw = report_data.encode("utf-8")
+    if len(raw) < COMPRESS_MIN_BYTES:
+        payload_format = PAYLOAD_RAW
+
+    if payload_format == PAYLOAD_ZSTD:
+        body = zstandard.ZstdCompressor(level=3).compress(raw)
+    elif payload_format == PAYLOAD_ZLIB:
+        body = zlib.compress(raw, 6)
+    else:
+        body = raw
+    return bytes((payload_format,)) + body
+
+
+def decode_payload(value) -> str:
+    """Decode a stored report_data value, accepting legacy TEXT rows."""
+    if isinstance(value, str):
+        return value
+
+    payload_format, body = value[0], value[1:]
+    if payload_format == PAYLOAD_RAW:
+        raw = body
+    elif payload_format == PAYLOAD_ZLIB:
+        raw = zlib.decompress(body)
+    elif payload_format == PAYLOAD_ZSTD:
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to read this shared report")
+        raw = zstandard.ZstdDecompressor().decompress(body)
+    else:
+        raise ValueError(f"Unknown report payload format: {payload_format}")
+    return raw.decode("utf-8")
+
+
+class SQLiteDatabase:
+    """
+    One SQLite file with a persistent connection per thread, in WAL mode
+    with synchronous=NORMAL.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._conns: List[sqlite3.Connection] = []
+        self._conns_lock = threading.Lock()
+
+    def conn(self) -> sqlite3.Connection:
+        """Return this thread's connection, opening it on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(
+                self.db_path,
+                timeout=5.0,
+                check_same_thread=False,  # only so close() can run from another thread
+                cached_statements=64,
+            )
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            with self._conns_lock:
+                self._conns.append(conn)
+        return conn
+
+    def close(self):
+        """Close every per-thread connection; they reopen lazily on next use."""
+        with self._conns_lock:
+            for conn in self._conns:
+                conn.close()
+            self._conns.clear()
+        self._local = threading.local()
+
+
+class ShareStore(ABC):
+    """Blocking storage interface for shared reports."""
+
+    def new_share_id(self) -> str:
+        """Generate a share_id for a new report."""
+        return uuid.uuid4().hex[:12]
+
+    def shard_of(self, share_id: str) -> int:
+        """Shard a share_id lives on; inserts are grouped per shard."""
+        return 0
+
+    @abstractmethod
+    def insert_many(self, rows: List[tuple]) -> List[Optional[Exception]]:
+        """
+        Insert (share_id, report_data, created_at, expires_at) rows.
+        Returns one error (or None) per row.
+        """
+
+    @abstractmethod
+    def get_report(self, share_id: str) -> Optional[Dict[str, Any]]:
+        """Retrieve an unexpired report by share_id."""
+
+    @abstractmethod
+    def delete_report(self, share_id: str):
+        """Delete a specific report."""
+
+    @abstractmethod
+    def delete_expired(self, limit: int) -> int:
+        """Remove up to `limit` expired reports. Returns the number deleted."""
+
+    def migrate_payloads(self, batch_size: int = 500) -> int:
+        """Convert one batch of legacy payloads. Returns rows converted."""
+        return 0
+
+    def vacuum(self):
+        """Reclaim free space after large deletes or migrations."""
+
+    def close(self):
+        """Release connections; the store reopens them lazily if used again."""
+
+
+class SQLiteShareStore(ShareStore):
+    """Shared reports in a single SQLite file."""
+
+    def __init__(self, db_path: str = DB_PATH):
+        self.db = SQLiteDatabase(db_path)
+        self._init_db()
+
+    @property
+    def db_path(self) -> str:
+        return self.db.db_path
+
+    def _init_db(self):
+        """Create the shared_reports table if it doesn't exist."""
+        conn = self.db.conn()
+        with conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS shared_reports (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    share_id TEXT UNIQUE NOT NULL,
+                    report_data BLOB NOT NULL,
+                    created_at TEXT NOT NULL,
+                    expires_at TEXT NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_share_id ON shared_reports (share_id)
+            """)
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_expires_at ON shared_reports (expires_at)
+            """)
+
+    def insert_many(self, rows: List[tuple]) -> List[Optional[Exception]]:
+        """
+        Insert all rows in a single transaction. If the batch fails, rows
+        are retried one by one so a bad row only fails itself.
+        """
+        encoded = [(share_id, encode_payload(data), created, expires)
+                   for share_id, data, created, expires in rows]
+        conn = self.db.conn()
+        try:
+            with conn:
+                conn.executemany(SQL_INSERT, encoded)
+            return [None] * len(rows)
+        except sqlite3.Error:
+            if len(rows) == 1:
+                raise
+
+        errors: List[Optional[Exception]] = []
+        for row in encoded:
+            try:
+                with conn:
+                    conn.execute(SQL_INSERT, row)
+                errors.append(None)
+            except sqlite3.Error as e:
+                errors.append(e)
+        return errors
+
+    def get_report(self, share_id: str) -> Optional[Dict[str, Any]]:
+        """Retrieve an unexpired report by share_id. Read-only."""
+        now = datetime.utcnow().isoformat()
+        row = self.db.conn().execute(SQL_SELECT, (share_id, now)).fetchone()
+        if not row:
+            return None
+        report = dict(row)
+        with span("payload.decode"):
+            report["report_data"] = decode_payload(report["report_data"])
+        return report
+
+    def delete_report(self, share_id: str):
+        conn = self.db.conn()
+        with conn:
+            conn.execute(SQL_DELETE, (share_id,))
+
+    def delete_expired(self, limit: int) -> int:
+        conn = self.db.conn()
+        now = datetime.utcnow().isoformat()
+        with conn:
+            return conn.execute(SQL_DELETE_EXPIRED, (now, limit)).rowcount
+
+    def migrate_payloads(self, batch_size: int = 500) -> int:
+        """
+        Rewrite one batch of legacy TEXT payloads as compressed BLOBs.
+        Returns the number of rows converted; 0 means migration is complete.
+        """
+        conn = self.db.conn()
+        rows = conn.execute(SQL_SELECT_TEXT_PAYLOADS, (batch_size,)).fetchall()
+        with conn:
+            conn.executemany(
+                SQL_UPDATE_PAYLOAD,
+                [(encode_payload(row["report_data"]), row["id"]) for row in rows],
+            )
+        return len(rows)
+
+    def vacuum(self):
+        self.db.conn().execute("VACUUM")
+
+    def close(self):
+        self.db.close()
+
+
+class ShardedSQLiteShareStore(ShareStore):
+    """
+    Shared reports spread across N SQLite files. The first two hex digits
+    of a share_id name its shard, so routing needs no lookup and workers
+    writing to different shards never contend on the same file lock.
+
+    The shard count must stay fixed once reports have been written.
+    """
+
+    def __init__(self, db_path: str = DB_PATH, shards: int = DB_SHARDS):
+        if not 1 <= shards <= 256:
+            raise ValueError("SHARE_DB_SHARDS must be between 1 and 256")
+        base, ext = os.path.splitext(db_path)
+        self.shards = [SQLiteShareStore(f"{base}.{i}{ext or '.db'}") for i in range(shards)]
+
+    def new_share_id(self) -> str:
+        shard = random.randrange(len(self.shards))
+        return f"{shard:02x}{uuid.uuid4().hex[:10]}"
+
+    def shard_of(self, share_id: str) -> int:
+        try:
+            return int(share_id[:2], 16) % len(self.shards)
+        except ValueError:
+            return 0
+
+    def _shard(self, share_id: str) -> SQLiteShareStore:
+        return self.shards[self.shard_of(share_id)]
+
+    def insert_many(self, rows: List[tuple]) -> List[Optional[Exception]]:
+        groups: Dict[int, List[int]] = {}
+        for index, row in enumerate(rows):
+            groups.setdefault(self.shard_of(row[0]), []).append(index)
+
+        errors: List[Optional[Exception]] = [None] * len(rows)
+        for shard, indexes in groups.items():
+            try:
+                results = self.shards[shard].insert_many([rows[i] for i in indexes])
+            except sqlite3.Error as e:
+                results = [e] * len(indexes)
+            for i, error in zip(indexes, results):
+                errors[i] = error
+        return errors
+
+    def get_report(self, share_id: str) -> Optional[Dict[str, Any]]:
+        return self._shard(share_id).get_report(share_id)
+
+    def delete_report(self, share_id: str):
+        self._shard(share_id).delete_report(share_id)
+
+    def delete_expired(self, limit: int) -> int:
+        deleted = 0
+        for shard in self.shards:
+            if deleted >= limit:
+                break
+            deleted += shard.delete_expired(limit - deleted)
+        return deleted
+
+    def migrate_payloads(self, batch_size: int = 500) -> int:
+        return sum(shard.migrate_payloads(batch_size) for shard in self.shards)
+
+    def vacuum(self):
+        for shard in self.shards:
+            shard.vacuum()
+
+    def close(self):
+        for shard in self.shards:
+            shard.close()
+
+
+class MemoryShareStore(ShareStore):
+    """Process-local store for tests and benchmarks. Nothing is persisted."""
+
+    def __init__(self):
+        self._reports: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def insert_many(self, rows: List[tuple]) -> List[Optional[Exception]]:
+        errors: List[Optional[Exception]] = []
+        with self._lock:
+            for share_id, report_data, created_at, expires_at in rows:
+                if share_id in self._reports:
+                    errors.append(KeyError(f"Duplicate share_id: {share_id}"))
+                    continue
+                self._reports[share_id] = {
+                    "share_id": share_id,
+                    "report_data": report_data,
+                    "created_at": created_at,
+                    "expires_at": expires_at,
+                }
+                errors.append(None)
+        return errors
+
+    def get_report(self, share_id: str) -> Optional[Dict[str, Any]]:
+        report = self._reports.get(share_id)
+        if report is None or report["expires_at"] <= datetime.utcnow().isoformat():
+            return None
+        return dict(report)
+
+    def delete_report(self, share_id: str):
+        with self._lock:
+            self._reports.pop(share_id, None)
+
+    def delete_expired(self, limit: int) -> int:
+        now = datetime.utcnow().isoformat()
+        with self._lock:
+            expired = [k for k, v in self._reports.items() if v["expires_at"] < now][:limit]
+            for share_id in expired:
+                del self._reports[share_id]
+        return len(expired)
+
+
+def create_store() -> ShareStore:
+    """Build the store selected by SHARE_DB_BACKEND / SHARE_DB_SHARDS."""
+    if DB_BACKEND == "memory":
+        return MemoryShareStore()
+    if DB_BACKEND != "sqlite":
+        raise ValueError(f"Unknown SHARE_DB_BACKEND: {DB_BACKEND}")
+    if DB_SHARDS > 1:
+        return ShardedSQLiteShareStore(DB_PATH, DB_SHARDS)
+    return SQLiteShareStore(DB_PATH)
@@ -0,0 +1,83 @@
+"""
+Adaptive speed test sizing from a quick pre-probe.
+
+The client measures its round-trip time and times one small transfer,
+and the plan is sized from those numbers. It gives slow links few bytes
+and fast links enough streams and bytes to get past TCP slow start.
+
+The probe underestimates fast links, because a small transfer ends
+before slow start opens the window, so byte budgets carry headroom. Tests
+run for a fixed duration and stop once it elapses, so headroom only costs
+bytes when the estimate was too low.
+"""
+
+import math
+from typing import Dict
+
+from services.transfer_sessions import RAMP_FRACTION
+
+
+# Per-request caps of /download and /upload
+REQUEST_SIZE_LIMITS = {"download": 10 * 1024 * 1024, "upload": 50 * 1024 * 1024}
+MIN_REQUEST_SIZE = 64 * 1024
+INITIAL_WINDOW = 10 * 1460  # Linux initial congestion window, bytes
+MIN_DURATION = 3.0
+MAX_DURATION = 12.0
+MAX_STREAMS = 8
+MAX_LINE_RATE = 100e9  # bits/sec; faster probe results are measurement noise
+BUDGET_HEADROOM = 2.0
+# (upper bound of the estimated rate in bits/sec, streams)
+STREAM_STEPS = ((25e6, 1), (100e6, 2), (400e6, 4), (1e9, 6))
+
+
+def estimate_bps(rtt_ms: float, probe_bytes: int, probe_seconds: float) -> float:
+    """Probe throughput with the request's round trip taken out, capped at MAX_LINE_RATE."""
+    transfer_seconds = max(probe_seconds - rtt_ms / 1000, probe_seconds * 0.1, 1e-3)
+    return min(MAX_LINE_RATE, probe_bytes * 8 / transfer_seconds)
+
+
+def recommend_streams(bps: float, rtt_ms: float) -> int:
+    streams = MAX_STREAMS
+    for limit, count in STREAM_STEPS:
+        if bps < limit:
+            streams = count
+            break
+    # Long paths need more parallel windows to fill the same pipe
+    if rtt_ms > 100 and bps >= STREAM_STEPS[0][0]:
+        streams += 2
+    return min(streams, MAX_STREAMS)
+
+
+def plan_test(direction: str, rtt_ms: float, probe_bytes: int, probe_seconds: float) -> Dict:
+    """
+    Plan one direction of a test.
+
+    - streams: parallel connections, grown with the estimated rate and RTT
+    - duration: long enough that slow start fits inside the ramp-up share
+      excluded from the steady-state rate (RAMP_FRACTION), within
+      MIN_DURATION..MAX_DURATION
+    - bytes: rate x duration x headroom, split across streams and into
+      requests no larger than the endpoint allows
+    """
+    bps = estimate_bps(rtt_ms, probe_bytes, probe_seconds)
+    streams = recommend_streams(bps, rtt_ms)
+
+    # Slow start doubles the window each round trip until it covers the per-stream BDP
+    bdp_per_stream = bps / 8 * (rtt_ms / 1000) / streams
+    ramp_rounds = max(1.0, math.log2(max(bdp_per_stream, INITIAL_WINDOW) / INITIAL_WINDOW))
+    ramp_seconds = ramp_rounds * rtt_ms / 1000
+    duration = min(MAX_DURATION, max(MIN_DURATION, ramp_seconds / RAMP_FRACTION))
+
+    bytes_per_stream = int(bps / 8 * duration * BUDGET_HEADROOM / streams)
+    request_size = min(REQUEST_SIZE_LIMITS[direction], max(MIN_REQUEST_SIZE, bytes_per_stream // 4))
+    requests_per_stream = max(1, math.ceil(bytes_per_stream / request_size))
+
+    return {
+        "direction": direction,
+        "estimated_bps": int(bps),
+        "streams": streams,
+        "duration_seconds": round(duration, 1),
+        "bytes_per_stream": requests_per_stream * request_size,
+        "request_size": request_size,
+        "requests_per_stream": requests_per_stream,
+    }
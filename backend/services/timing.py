@@ -0,0 +1,127 @@
+"""
+Per-request phase timing, reported as a Server-Timing header.
+
+Code marks phases with `span("name")` (or the `traced("name")` decorator).
+Spans are only recorded while a request is being traced, i.e. when
+ServerTimingMiddleware is installed. Otherwise `span()` is one ContextVar
+lookup that returns a shared no-op context manager.
+
+Span names are Server-Timing metric names: `geo`, `db.get_report`,
+`json.decode`, `card.png` and so on. Repeated spans with the same name are
+summed. Work handed to ShareDB's executor threads runs in a copy of the
+request context, so spans recorded there land in the same request.
+"""
+
+import time
+import random
+import functools
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+
+# (name, seconds) pairs for the request being traced, or None when not tracing
+_spans: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar("server_timing_spans", default=None)
+
+
+class _Span:
+    __slots__ = ("name", "spans", "start")
+
+    def __init__(self, name: str, spans: List[Tuple[str, float]]):
+        self.name = name
+        self.spans = spans
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.spans.append((self.name, time.perf_counter() - self.start))
+        return False
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+def span(name: str):
+    """Context manager timing one phase of the current request."""
+    spans = _spans.get()
+    if spans is None:
+        return _NOOP
+    return _Span(name, spans)
+
+
+def traced(name: str):
+    """Decorator form of span() for plain functions."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            spans = _spans.get()
+            if spans is None:
+                return func(*args, **kwargs)
+            with _Span(name, spans):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def summarize(spans: List[Tuple[str, float]]) -> Dict[str, float]:
+    """Total milliseconds per span name, in first-seen order."""
+    totals: Dict[str, float] = {}
+    for name, seconds in spans:
+        totals[name] = totals.get(name, 0.0) + seconds * 1000
+    return totals
+
+
+def server_timing_header(totals: Dict[str, float]) -> str:
+    return ", ".join(f"{name};dur={ms:.2f}" for name, ms in totals.items())
+
+
+class ServerTimingMiddleware:
+    """
+    Pure ASGI middleware that traces every HTTP request, adds a
+    Server-Timing header (phases plus `total`), and prints a sample of
+    requests slower than `slow_request_ms` to the log.
+    """
+
+    def __init__(self, app, emit_header: bool = True, slow_request_ms: float = 0.0, sample_rate: float = 1.0):
+        self.app = app
+        self.emit_header = emit_header
+        self.slow_request_ms = slow_request_ms
+        self.sample_rate = sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        spans: List[Tuple[str, float]] = []
+        token = _spans.set(spans)
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and self.emit_header:
+                totals = summarize(spans)
+                totals["total"] = (time.perf_counter() - start) * 1000
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", server_timing_header(totals).encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _spans.reset(token)
+            total_ms = (time.perf_counter() - start) * 1000
+            if self.slow_request_ms and total_ms >= self.slow_request_ms and random.random() < self.sample_rate:
+                phases = " ".join(f"{name}={ms:.1f}ms" for name, ms in summarize(spans).items())
+                print(f"Slow request: {scope['method']} {scope['path']} {total_ms:.1f}ms {phases}".rstrip())
@@ -0,0 +1,251 @@
+"""
+Multi-stream transfer sessions.
+
+A client saturating a fast link opens several parallel download or upload
+streams. Tagging each request with one session id lets the server put all
+streams on a shared timeline and compute the combined throughput itself,
+instead of the client stitching together timings from separate
+connections.
+
+Bytes are counted into fixed-width bins (`bin_ms`) measured from the
+session start on the host's monotonic clock, which every worker process
+shares. Each request collects its bins in memory and writes them in one
+transaction when it ends, so streams served by different workers add up
+in the same SQLite rows.
+"""
+
+import os
+import time
+import asyncio
+import secrets
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Optional, Dict, Any, Callable, List, Tuple, TypeVar
+from services.share_store import SQLiteDatabase
+from services.ttl_cache import TTLCache
+from services.metrics import db_op_seconds, timed_call
+
+
+TRANSFER_SESSION_DB_PATH = os.environ.get("TRANSFER_SESSION_DB_PATH", "transfer_sessions.db")
+SESSION_TTL = 600  # seconds
+MAX_SESSION_SECONDS = 120  # bytes later than this after the start are ignored
+DEFAULT_BIN_MS = 100
+# Leading share of a transfer excluded from the steady-state rate (TCP ramp-up)
+RAMP_FRACTION = 0.25
+
+SQL_ADD_BINS = """
+    INSERT INTO transfer_bins (session_id, direction, stream, bin, bytes)
+    VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT (session_id, direction, stream, bin) DO UPDATE SET
+        bytes = bytes + excluded.bytes
+"""
+
+T = TypeVar("T")
+
+
+class TransferSessionStore:
+    def __init__(self, db_path: str = TRANSFER_SESSION_DB_PATH):
+        self.db = SQLiteDatabase(db_path)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # session_id -> (start_ns, bin_ms); sessions never change once created
+        self._sessions = TTLCache(max_entries=4096)
+        # Tables are created on first use, so importing the router touches no files
+        self._initialized = False
+
+    def _init_db(self):
+        conn = self.db.conn()
+        with conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS transfer_sessions (
+                    session_id TEXT PRIMARY KEY,
+                    start_ns INTEGER NOT NULL,
+                    bin_ms INTEGER NOT NULL,
+                    expires_at INTEGER NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS transfer_bins (
+                    session_id TEXT NOT NULL,
+                    direction TEXT NOT NULL,
+                    stream INTEGER NOT NULL,
+                    bin INTEGER NOT NULL,
+                    bytes INTEGER NOT NULL,
+                    PRIMARY KEY (session_id, direction, stream, bin)
+                ) WITHOUT ROWID
+            """)
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_transfer_sessions_expires "
+                "ON transfer_sessions(expires_at)"
+            )
+
+    def _ensure_db(self):
+        if not self._initialized:
+            self._init_db()
+            self._initialized = True
+
+    async def run(self, func: Callable[..., T], *args, **kwargs) -> T:
+        """Run a blocking store method on the store's own thread."""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="transfer-db")
+        loop = asyncio.get_running_loop()
+        call = timed_call(db_op_seconds, partial(func, *args, **kwargs), "transfer", func.__name__)
+
+        def call_with_db():
+            self._ensure_db()
+            return call()
+        return await loop.run_in_executor(self._executor, call_with_db)
+
+    def create(self, bin_ms: int) -> Dict[str, Any]:
+        session_id = secrets.token_urlsafe(12)
+        start_ns = time.monotonic_ns()
+        expires_at = int(time.time()) + SESSION_TTL
+        conn = self.db.conn()
+        with conn:
+            conn.execute(
+                "INSERT INTO transfer_sessions (session_id, start_ns, bin_ms, expires_at) VALUES (?, ?, ?, ?)",
+                (session_id, start_ns, bin_ms, expires_at),
+            )
+        self._sessions.set(session_id, (start_ns, bin_ms), expires_at)
+        return {"session_id": session_id, "start_ns": start_ns, "bin_ms": bin_ms, "expires_at": expires_at}
+
+    def get_session(self, session_id: str) -> Optional[Tuple[int, int]]:
+        """(start_ns, bin_ms) of a live session, or None."""
+        cached = self._sessions.get(session_id)
+        if cached is not None:
+            return cached
+        row = self.db.conn().execute(
+            "SELECT start_ns, bin_ms, expires_at FROM transfer_sessions WHERE session_id = ? AND expires_at > ?",
+            (session_id, int(time.time())),
+        ).fetchone()
+        if row is None:
+            return None
+        session = (row["start_ns"], row["bin_ms"])
+        self._sessions.set(session_id, session, row["expires_at"])
+        return session
+
+    def add_bins(self, session_id: str, direction: str, stream: int, bins: Dict[int, int]):
+        """Add one request's byte counts to its stream, in one transaction."""
+        if not bins:
+            return
+        conn = self.db.conn()
+        with conn:
+            conn.executemany(
+                SQL_ADD_BINS,
+                [(session_id, direction, stream, b, n) for b, n in bins.items()],
+            )
+
+    def get_bins(self, session_id: str) -> List[Tuple[str, int, int, int]]:
+        """(direction, stream, bin, bytes) rows of a session, in bin order."""
+        rows = self.db.conn().execute(
+            "SELECT direction, stream, bin, bytes FROM transfer_bins WHERE session_id = ? ORDER BY bin",
+            (session_id,),
+        ).fetchall()
+        return [tuple(row) for row in rows]
+
+    def delete_expired(self) -> int:
+        now = int(time.time())
+        conn = self.db.conn()
+        with conn:
+            conn.execute(
+                "DELETE FROM transfer_bins WHERE session_id IN "
+                "(SELECT session_id FROM transfer_sessions WHERE expires_at <= ?)",
+                (now,),
+            )
+            return conn.execute("DELETE FROM transfer_sessions WHERE expires_at <= ?", (now,)).rowcount
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        self.db.close()
+
+
+class StreamRecorder:
+    """Bins the bytes of one request on its session's timeline."""
+
+    __slots__ = ("session_id", "direction", "stream", "start_ns", "bin_ns", "max_bin", "bins")
+
+    def __init__(self, session_id: str, direction: str, stream: int, start_ns: int, bin_ms: int):
+        self.session_id = session_id
+        self.direction = direction
+        self.stream = stream
+        self.start_ns = start_ns
+        self.bin_ns = bin_ms * 1_000_000
+        self.max_bin = MAX_SESSION_SECONDS * 1000 // bin_ms
+        self.bins: Dict[int, int] = {}
+
+    def add(self, nbytes: int):
+        b = (time.monotonic_ns() - self.start_ns) // self.bin_ns
+        if b < self.max_bin:
+            self.bins[b] = self.bins.get(b, 0) + nbytes
+
+    async def flush(self, store: TransferSessionStore):
+        """Write pending bins; safe to call more than once."""
+        if not self.bins:
+            return
+        bins, self.bins = self.bins, {}
+        try:
+            await store.run(store.add_bins, self.session_id, self.direction, self.stream, bins)
+        except Exception as e:
+            print(f"Transfer session flush error: {e}")
+
+
+def steady_state_bps(rates: List[float]) -> float:
+    """
+    Mean of the per-bin rates after the ramp-up. The first RAMP_FRACTION
+    of the bins is skipped, and so is the last bin, which is usually only
+    partly filled.
+    """
+    if len(rates) > 2:
+        rates = rates[:-1]
+    skip = int(len(rates) * RAMP_FRACTION)
+    steady = rates[skip:]
+    return sum(steady) / len(steady) if steady else 0.0
+
+
+def summarize(rows: List[Tuple[str, int, int, int]], bin_ms: int) -> Dict[str, Dict[str, Any]]:
+    """
+    Per-direction totals, per-stream bytes, the combined throughput curve
+    (one point per bin, from the first to the last bin with traffic) and
+    the steady-state rate.
+    """
+    per_direction: Dict[str, Dict[int, Dict[int, int]]] = {}
+    for direction, stream, b, nbytes in rows:
+        per_direction.setdefault(direction, {}).setdefault(b, {})[stream] = nbytes
+
+    bin_seconds = bin_ms / 1000
+    summary = {}
+    for direction, bins in per_direction.items():
+        first, last = min(bins), max(bins)
+        streams: Dict[str, int] = {}
+        curve = []
+        rates = []
+        for b in range(first, last + 1):
+            by_stream = bins.get(b, {})
+            for stream, nbytes in by_stream.items():
+                streams[str(stream)] = streams.get(str(stream), 0) + nbytes
+            bps = sum(by_stream.values()) * 8 / bin_seconds
+            rates.append(bps)
+            curve.append({"t_ms": b * bin_ms, "bps": int(bps), "streams": len(by_stream)})
+
+        total = sum(streams.values())
+        duration = (last - first + 1) * bin_ms / 1000
+        summary[direction] = {
+            "bytes": total,
+            "streams": dict(sorted(streams.items(), key=lambda item: int(item[0]))),
+            "duration_seconds": duration,
+            "average_bps": int(total * 8 / duration),
+            "steady_state_bps": int(steady_state_bps(rates)),
+            "curve": curve,
+        }
+    return summary
+
+
+async def sweep_expired_sessions(store: TransferSessionStore, interval: float):
+    """Background task that deletes expired sessions and their bins."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await store.run(store.delete_expired)
+        except Exception as e:
+            print(f"Transfer session sweep error: {e}")
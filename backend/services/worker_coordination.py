@@ -0,0 +1,59 @@
+"""
+Coordination between uvicorn worker processes on one host.
+
+Every worker runs the full lifespan, but maintenance jobs that act on the
+shared SQLite files (expired-share sweeps, result rollups) only need to run
+once per host. Workers elect a leader with an exclusive flock on a lock
+file: the leader runs those jobs, the others keep retrying so one of them
+takes over if the leader exits.
+"""
+
+import os
+import asyncio
+from typing import Awaitable, Callable, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows, where every process leads
+    fcntl = None
+
+
+LOCK_RETRY_INTERVAL = 5.0  # seconds between election attempts
+
+
+def try_lock(path: str) -> Optional[int]:
+    """Take the leader lock without blocking; returns the held fd or None."""
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    if fcntl is None:
+        return fd
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        os.close(fd)
+        return None
+    os.ftruncate(fd, 0)
+    os.write(fd, str(os.getpid()).encode())
+    return fd
+
+
+async def run_as_leader(
+    lock_path: str,
+    jobs: Callable[[], List[Awaitable]],
+    retry_interval: float = LOCK_RETRY_INTERVAL
+):
+    """
+    Background task that waits to become the leader worker, then runs the
+    coroutines returned by `jobs` until cancelled. The lock is released
+    (by closing the fd) when this task ends.
+    """
+    fd = None
+    try:
+        while fd is None:
+            fd = try_lock(lock_path)
+            if fd is None:
+                await asyncio.sleep(retry_interval)
+        print(f"Worker {os.getpid()} is running host-wide maintenance jobs")
+        await asyncio.gather(*jobs())
+    finally:
+        if fd is not None:
+            os.close(fd)
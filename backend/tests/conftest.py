@@ -0,0 +1,11 @@
+import os
+import sys
+import tempfile
+
+# Import the app modules from backend/, with databases kept out of the tree
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+_tmp = tempfile.mkdtemp(prefix="speedtest-tests-")
+os.environ.setdefault("SHARE_DB_BACKEND", "memory")
+os.environ.setdefault("RESULTS_DB_PATH", os.path.join(_tmp, "test_results.db"))
+os.environ.setdefault("TRANSFER_SESSION_DB_PATH", os.path.join(_tmp, "transfer_sessions.db"))
+os.environ.setdefault("WORKER_LOCK_PATH", os.path.join(_tmp, "workers.lock"))
@@ -0,0 +1,33 @@
+import asyncio
+
+from services.admission import AdmissionController, AdmissionRejected
+
+
+async def _admit(controller: AdmissionController, client_ip: str) -> str:
+    try:
+        await controller.admit(client_ip)
+        return "admitted"
+    except AdmissionRejected as e:
+        return str(e.status_code)
+
+
+def test_parallel_streams_queued_at_capacity_share_one_lease():
+    async def scenario():
+        controller = AdmissionController(max_tests=1, queue_timeout=0.5)
+        await controller.admit("A")
+        streams = [asyncio.create_task(_admit(controller, "B")) for _ in range(4)]
+        await asyncio.sleep(0.1)
+        controller.release("A")
+        controller.lease_seconds = 0  # A's test is over
+        return await asyncio.gather(*streams)
+
+    assert asyncio.run(scenario()) == ["admitted"] * 4
+
+
+def test_new_test_at_capacity_gets_busy():
+    async def scenario():
+        controller = AdmissionController(max_tests=1, queue_timeout=0.1)
+        await controller.admit("A")
+        return await _admit(controller, "B")
+
+    assert asyncio.run(scenario()) == "503"
@@ -0,0 +1,27 @@
+import pytest
+
+from services.impairment import parse_token
+
+
+@pytest.mark.parametrize("token", [
+    "latency=1e12",
+    "latency=inf",
+    "latency=nan",
+    "jitter=5001",
+    "down=1bit",
+    "up=1000gbit",
+    "down=inf",
+    "loss=nan",
+    "loss=1",
+    "latency=-1",
+])
+def test_rejects_out_of_range_values(token):
+    with pytest.raises(ValueError):
+        parse_token(token)
+
+
+def test_accepts_values_within_limits():
+    profile = parse_token("3g,down=0,up=8kbit,latency=5000,jitter=0")
+    assert profile.down_bps == 0
+    assert profile.up_bps == 8e3
+    assert profile.latency_ms == 5000
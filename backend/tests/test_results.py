@@ -0,0 +1,35 @@
+import time
+
+from fastapi.testclient import TestClient
+
+import main
+from services.results_store import ResultsStore
+
+VALID = {"ping": 12.5, "jitter": 1.5, "download_mbps": 250, "upload_mbps": 40}
+
+
+def test_rejects_non_finite_and_out_of_range_results():
+    client = TestClient(main.app)
+    for field, value in [("ping", "NaN"), ("download_mbps", -1), ("upload_mbps", 1e9)]:
+        response = client.post("/api/v1/results", json={**VALID, field: value})
+        assert response.status_code == 422, field
+    response = client.post("/api/v1/results", json={**VALID, "asn": "x" * 1000})
+    assert response.status_code == 422
+
+
+def test_rejects_out_of_range_aggregate_bounds():
+    client = TestClient(main.app)
+    response = client.get("/api/v1/results/aggregates", params={"since": 2 ** 70})
+    assert response.status_code == 422
+
+
+def test_bad_row_does_not_lose_the_batch(tmp_path):
+    store = ResultsStore(str(tmp_path / "results.db"))
+    now = int(time.time())
+    good = (now, "AS1", "US", "auto", 10.0, 1.0, 100.0, 20.0, 90)
+    bad = (now, "AS1", "US", "auto", float("nan"), 1.0, 100.0, 20.0, 90)
+    store.insert_results([good, bad, good])
+    count = store.db.conn().execute("SELECT COUNT(*) FROM results").fetchone()[0]
+    assert count == 2
+    assert store.dropped == 1
+    store.close()
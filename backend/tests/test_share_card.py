@@ -0,0 +1,33 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+
+
+def _share(client: TestClient, report_data) -> str:
+    response = client.post("/api/v1/share/create", json={"report_data": report_data})
+    assert response.status_code == 200
+    return response.json()["share_id"]
+
+
+@pytest.mark.parametrize("report_data", [
+    [1, 2, 3],
+    "just a string",
+    {"speedResult": {"download": {"speedMbps": "fast"}}},
+    {"speedResult": {"download": {"speedMbps": "NaN"}}},
+    {"speedResult": [1]},
+])
+def test_malformed_report_card_is_422(report_data):
+    with TestClient(main.app) as client:
+        share_id = _share(client, report_data)
+        response = client.get(f"/api/v1/share/{share_id}/card.svg")
+        assert response.status_code == 422
+
+
+def test_well_formed_report_card_renders():
+    report = {"speedResult": {"download": {"speedMbps": 120.5}, "ping": {"latencyMs": "12"}}}
+    with TestClient(main.app) as client:
+        share_id = _share(client, report)
+        response = client.get(f"/api/v1/share/{share_id}/card.svg")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("image/svg")
@@ -0,0 +1,20 @@
+from fastapi.testclient import TestClient
+
+import main
+from services.test_sizing import MAX_LINE_RATE, plan_test
+
+
+def test_plan_rejects_oversized_probe():
+    client = TestClient(main.app)
+    response = client.post(
+        "/api/v1/speedtest/plan",
+        json={"rtt_ms": 10, "probe_bytes": 10 ** 18, "probe_seconds": 0.001},
+    )
+    assert response.status_code == 422
+
+
+def test_plan_caps_estimated_rate():
+    plan = plan_test("download", rtt_ms=1, probe_bytes=50 * 1024 * 1024, probe_seconds=0.0001)
+    assert plan["estimated_bps"] == int(MAX_LINE_RATE)
+    assert plan["requests_per_stream"] * plan["request_size"] == plan["bytes_per_stream"]
+    assert plan["bytes_per_stream"] < 2 ** 63